@@ -6,7 +6,7 @@ class Evaluation(Base):
     __tablename__ = "evaluations"
 
     id = Column(Integer, primary_key=True, index=True)
-    game_id = Column(Integer, ForeignKey("games.id"), unique=True)
+    game_id = Column(Integer, ForeignKey("games.id"), unique=True, index=True)  # Índice único ix_evaluations_game_id, o mesmo da migration c7a4e2f9d815
     evaluation = Column(Integer)  # Centipawns
     depth = Column(Integer)
     win_probability_white = Column(Float)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
+from datetime import datetime
+from database.database import Base
+
+class GameSummary(Base):
+    __tablename__ = "game_summaries"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    game_id = Column(Integer, ForeignKey("games.id", ondelete="CASCADE"), nullable=False, unique=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    good_moves = Column(Integer, nullable=False, default=0)
+    blunders = Column(Float, nullable=False, default=0)  # Pequenos erros contam meio ponto
+    total_moves = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_game_summaries_user_id_game_id", "user_id", "game_id"),  # Últimas N partidas do usuário
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Boolean, String, ForeignKey
+from sqlalchemy import Column, Integer, Boolean, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from database.database import Base
 
@@ -8,5 +8,13 @@ class Game(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     status = Column(String(50), default="in_progress")
+    begin_time = Column(DateTime, nullable=True)
+    end_time = Column(DateTime, nullable=True)
+    difficulty = Column(String(20), nullable=True)  # Perfil do motor da partida; None usa o padrão do pool
 
     user = relationship("User")  # Relacionamento opcional
+
+    __table_args__ = (
+        Index("ix_games_user_id_status_id", "user_id", "status", "id"),  # Jogo em andamento do usuário
+        Index("ix_games_status_id", "status", "id"),  # Jogos por status, em ordem (exportação em PGN)
+    )
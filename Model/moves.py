@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Boolean, String, ForeignKey
+from sqlalchemy import Column, Integer, Boolean, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database.database import Base
 
@@ -6,7 +6,7 @@ class Move(Base):
     __tablename__ = "moves"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    is_player = Column(Boolean, nullable=False)
+    is_player = Column(Boolean, nullable=True)  # Nulo na jogada vazia que marca o início do jogo
     move = Column(String(4), nullable=False)
     board_string = Column(String(250), nullable=False)
     mv_quality = Column(String(10), nullable=True)
@@ -14,3 +14,7 @@ class Move(Base):
     created_at = Column(String(250), nullable=False)
 
     game = relationship("Game", backref="moves")  # Relacionamento opcional
+
+    __table_args__ = (
+        Index("ix_moves_game_id_id", "game_id", "id"),  # Jogadas de um jogo, em ordem
+    )
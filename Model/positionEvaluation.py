@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from database.database import Base
+
+class PositionEvaluation(Base):
+    __tablename__ = "position_evaluations"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    fen = Column(String(100), nullable=False, unique=True, index=True)  # FEN normalizado (EPD, sem contadores de lances)
+    score_type = Column(String(4), nullable=False)  # "cp" ou "mate"
+    score = Column(Integer, nullable=False)  # Do ponto de vista das brancas
+    depth = Column(Integer, nullable=False)
+    best_move = Column(String(5), nullable=True)  # Primeira jogada da variante principal
+    wdl_win = Column(Integer, nullable=True)  # Por mil, do ponto de vista das brancas
+    wdl_draw = Column(Integer, nullable=True)
+    wdl_loss = Column(Integer, nullable=True)
+    last_updated = Column(DateTime, default=datetime.utcnow)
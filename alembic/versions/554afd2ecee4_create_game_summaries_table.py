@@ -0,0 +1,37 @@
+"""create game_summaries table
+
+Revision ID: 554afd2ecee4
+Revises: 65d1fdd4245c
+Create Date: 2026-10-16 11:03:27.918264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '554afd2ecee4'
+down_revision: Union[str, None] = '65d1fdd4245c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        'game_summaries',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('game_id', sa.Integer(), sa.ForeignKey('games.id', ondelete="CASCADE"), nullable=False, unique=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('good_moves', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('blunders', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('total_moves', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True)
+    )
+    op.create_index('ix_game_summaries_user_id_game_id', 'game_summaries', ['user_id', 'game_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_game_summaries_user_id_game_id', table_name='game_summaries')
+    op.drop_table('game_summaries')
@@ -0,0 +1,40 @@
+"""create position_evaluations table
+
+Revision ID: 65d1fdd4245c
+Revises: 57af3ca4c2ad
+Create Date: 2026-10-16 10:12:41.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '65d1fdd4245c'
+down_revision: Union[str, None] = '57af3ca4c2ad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        'position_evaluations',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('fen', sa.String(length=100), nullable=False),
+        sa.Column('score_type', sa.String(length=4), nullable=False),
+        sa.Column('score', sa.Integer(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.Column('best_move', sa.String(length=5), nullable=True),
+        sa.Column('wdl_win', sa.Integer(), nullable=True),
+        sa.Column('wdl_draw', sa.Integer(), nullable=True),
+        sa.Column('wdl_loss', sa.Integer(), nullable=True),
+        sa.Column('last_updated', sa.DateTime(), nullable=True)
+    )
+    op.create_index('ix_position_evaluations_fen', 'position_evaluations', ['fen'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_position_evaluations_fen', table_name='position_evaluations')
+    op.drop_table('position_evaluations')
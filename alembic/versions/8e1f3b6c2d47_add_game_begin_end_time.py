@@ -0,0 +1,39 @@
+"""add begin_time and end_time to games
+
+Revision ID: 8e1f3b6c2d47
+Revises: 554afd2ecee4
+Create Date: 2026-10-16 14:20:41.503217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e1f3b6c2d47'
+down_revision: Union[str, None] = '554afd2ecee4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _columns():
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns('games')}
+
+
+def upgrade():
+    # Bancos antigos já têm as colunas (criadas fora das migrations); só os novos precisam delas
+    existing = _columns()
+    with op.batch_alter_table('games') as batch_op:
+        for name in ('begin_time', 'end_time'):
+            if name not in existing:
+                batch_op.add_column(sa.Column(name, sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    existing = _columns()
+    with op.batch_alter_table('games') as batch_op:
+        for name in ('end_time', 'begin_time'):
+            if name in existing:
+                batch_op.drop_column(name)
@@ -0,0 +1,35 @@
+"""add status to games
+
+Revision ID: a9e2c4f7b130
+Revises: b5d0e7a91c3f
+Create Date: 2026-10-16 21:18:52.406113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e2c4f7b130'
+down_revision: Union[str, None] = 'b5d0e7a91c3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _columns():
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns('games')}
+
+
+def upgrade():
+    # Bancos antigos já têm a coluna (criada fora das migrations); só os novos precisam dela
+    if 'status' not in _columns():
+        with op.batch_alter_table('games') as batch_op:
+            batch_op.add_column(sa.Column('status', sa.String(50), nullable=True, server_default='in_progress'))
+
+
+def downgrade() -> None:
+    if 'status' in _columns():
+        with op.batch_alter_table('games') as batch_op:
+            batch_op.drop_column('status')
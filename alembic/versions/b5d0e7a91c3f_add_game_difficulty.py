@@ -0,0 +1,28 @@
+"""add difficulty to games
+
+Revision ID: b5d0e7a91c3f
+Revises: 8e1f3b6c2d47
+Create Date: 2026-10-16 15:02:09.117352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d0e7a91c3f'
+down_revision: Union[str, None] = '8e1f3b6c2d47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    with op.batch_alter_table('games') as batch_op:
+        batch_op.add_column(sa.Column('difficulty', sa.String(20), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('games') as batch_op:
+        batch_op.drop_column('difficulty')
@@ -0,0 +1,52 @@
+"""add indexes for the hot game and move queries
+
+Revision ID: c7a4e2f9d815
+Revises: a9e2c4f7b130
+Create Date: 2026-10-16 21:24:37.640918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a4e2f9d815'
+down_revision: Union[str, None] = 'a9e2c4f7b130'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Os das consultas quentes são conferidos por database/query_plans.py (e pelos testes)
+INDEXES = (
+    ('ix_moves_game_id_id', 'moves', ['game_id', 'id'], False),  # Jogadas de um jogo, em ordem
+    ('ix_games_user_id_status_id', 'games', ['user_id', 'status', 'id'], False),  # Jogo em andamento do usuário
+    ('ix_games_status_id', 'games', ['status', 'id'], False),  # Jogos por status, em ordem (exportação em PGN)
+    ('ix_evaluations_game_id', 'evaluations', ['game_id'], True),  # Avaliação atual do jogo (uma por jogo)
+)
+
+
+def _indexes(table):
+    return {index['name']: bool(index['unique']) for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # O modelo declara uma avaliação por jogo; fica só a mais recente antes do índice único
+    op.execute(
+        "DELETE FROM evaluations WHERE id NOT IN "
+        "(SELECT MAX(id) FROM evaluations GROUP BY game_id) AND game_id IS NOT NULL"
+    )
+    # Criados só se ainda não existirem (bancos antigos podem ter sido ajustados à mão)
+    for name, table, columns, unique in INDEXES:
+        existing = _indexes(table)
+        if name in existing and existing[name] != unique:
+            op.drop_index(name, table_name=table)
+            existing.pop(name)
+        if name not in existing:
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        if name in _indexes(table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,45 @@
+"""allow null moves.is_player and games.player_win
+
+Revision ID: e3b7f05a92d4
+Revises: c7a4e2f9d815
+Create Date: 2026-10-17 09:41:18.220734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7f05a92d4'
+down_revision: Union[str, None] = 'c7a4e2f9d815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# A jogada inicial de cada jogo tem is_player nulo; player_win não existe mais no modelo (o resultado fica em status)
+COLUMNS = (
+    ('moves', 'is_player'),
+    ('games', 'player_win'),
+)
+
+
+def _columns(table):
+    return {column['name']: column for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    for table, name in COLUMNS:
+        column = _columns(table).get(name)
+        if column is not None and not column['nullable']:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.alter_column(name, existing_type=column['type'], nullable=True)
+
+
+def downgrade() -> None:
+    for table, name in reversed(COLUMNS):
+        column = _columns(table).get(name)
+        if column is not None and column['nullable']:
+            op.execute(f"UPDATE {table} SET {name} = 0 WHERE {name} IS NULL")
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.alter_column(name, existing_type=column['type'], nullable=False)
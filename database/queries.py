@@ -0,0 +1,32 @@
+"""Consultas feitas a cada jogada e nas telas de partida.
+
+As rotas montam essas consultas por aqui, e ``database.query_plans``
+confere o plano delas: se uma mudar, a conferência acompanha.
+"""
+from Model.evaluation import Evaluation
+from Model.games import Game
+from Model.moves import Move
+
+
+def game_moves(db, game_id: int, *columns):
+    """Jogadas do jogo, em ordem; sem ``columns``, a linha inteira."""
+    return db.query(*(columns or (Move,))).filter(Move.game_id == game_id).order_by(Move.id)
+
+
+def last_move(db, game_id: int):
+    """Posição (FEN) depois da última jogada do jogo."""
+    return db.query(Move.board_string).filter(Move.game_id == game_id).order_by(Move.id.desc())
+
+
+def user_games(db, user_id: int, status: str, *columns):
+    """Jogos do usuário com o status ``status``, do mais recente ao mais antigo; sem ``columns``, a linha inteira."""
+    return (
+        db.query(*(columns or (Game,)))
+        .filter(Game.user_id == user_id, Game.status == status)
+        .order_by(Game.id.desc())
+    )
+
+
+def game_evaluation(db, game_id: int):
+    """Avaliação atual do jogo (uma por jogo)."""
+    return db.query(Evaluation).filter(Evaluation.game_id == game_id)
@@ -0,0 +1,58 @@
+"""Confere, com ``EXPLAIN QUERY PLAN``, que as consultas quentes usam os índices.
+
+Uso (depois de ``alembic upgrade head``)::
+
+    python -m database.query_plans
+
+``tests/test_query_plans.py`` faz a mesma conferência num banco novo,
+criado pelas migrations.
+
+Sai com código 1 se alguma consulta varrer uma tabela inteira ou precisar
+ordenar o resultado à parte: o tempo de cada jogada voltaria a crescer
+com o histórico de partidas.
+"""
+import sys
+
+from sqlalchemy import text
+
+from database import queries
+from database.database import SessionLocal
+from Model.moves import Move
+
+# Consultas de cada jogada e das telas de partida, montadas pelas mesmas funções das rotas (com valores de exemplo)
+HOT_QUERIES = {
+    "jogadas do jogo": lambda db: queries.game_moves(db, 1, Move.move, Move.board_string),
+    "última jogada do jogo": lambda db: queries.last_move(db, 1).limit(1),
+    "jogo em andamento do usuário": lambda db: queries.user_games(db, 1, "in_progress").limit(1),
+    "avaliação do jogo": lambda db: queries.game_evaluation(db, 1).limit(1),
+}
+
+
+def query_plan(db, query) -> list[str]:
+    sql = query.statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    return [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def slow_steps(plan: list[str]) -> list[str]:
+    # SEARCH usa um índice; SCAN lê a tabela (ou o índice) inteira e TEMP B-TREE ordena tudo em memória
+    return [step for step in plan if step.startswith("SCAN") or "TEMP B-TREE" in step]
+
+
+def check_query_plans(db) -> dict:
+    """Passos lentos de cada consulta quente (vazio quando todas usam índices)."""
+    problems = {}
+    for name, build in HOT_QUERIES.items():
+        steps = slow_steps(query_plan(db, build(db)))
+        if steps:
+            problems[name] = steps
+    return problems
+
+
+if __name__ == "__main__":
+    with SessionLocal() as db:
+        problems = check_query_plans(db)
+    for name, steps in problems.items():
+        print(f"{name}: {'; '.join(steps)}")
+    if problems:
+        sys.exit(1)
+    print("Todas as consultas quentes usam índices.")
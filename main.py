@@ -1,21 +1,36 @@
-from fastapi import FastAPI, Depends, HTTPException, Security, Header, BackgroundTasks, Query
+from fastapi import FastAPI, Depends, HTTPException, Security, Header, BackgroundTasks, Query, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.openapi.models import APIKey
 from fastapi.openapi.utils import get_openapi
 from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
 from sqlalchemy import desc
 from sqlalchemy.orm import Session
 from database.database import SessionLocal, engine
-from stockfish import Stockfish
+from services.engine_pool import EnginePool, EngineUnavailableError, MAX_SKILL_LEVEL
+from services.analysis_cache import AnalysisCache
+from services.evaluation_store import EvaluationStore
+from services.evaluation_queue import EvaluationQueue
+from services.opening_book import OpeningBook
+from services.tablebase import Tablebase
+from services.speculation import SpeculativeScheduler
+from services.game_analysis import analyze_game, classify_move, summarize_game
+from services.batch_analysis import analyze_batch, batch_positions
+from services.pgn import export_games, import_games
+from services.board_render import board_matrix, board_visual
+from services.game_replay import ReplayCache, replay_positions
+from services.game_locks import GameLocks
+from services.active_games import ActiveGame, ActiveGameCache
 from passlib.hash import bcrypt
 from database.database import get_db 
+from database import queries
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from jwt import ExpiredSignatureError, DecodeError
 from uuid import uuid4
 from starlette.status import HTTP_400_BAD_REQUEST
@@ -28,6 +43,7 @@ from Model.games import Game
 from Model.moves import Move
 from Model.evaluation import Evaluation
 from Model.robotToken import RobotToken
+from Model.gameSummary import GameSummary
 
 import jwt
 import math
@@ -40,11 +56,37 @@ import chess.engine
 import socketio
 import asyncio
 import json
+from contextlib import asynccontextmanager
 from typing import Dict, List, Optional
 
 sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Sobe os motores Stockfish ao iniciar a aplicação e os encerra ao final.
+
+    O aquecimento roda em segundo plano: enquanto ele não termina, ``/ready``
+    responde 503 e as rotas que usam o motor aguardam até
+    ``ENGINE_READY_TIMEOUT`` segundos (depois, 503). Um motor que falha no
+    aquecimento não impede o pool de ficar pronto.
+    """
+    if not STOCKFISH_PATH:
+        raise ValueError("A variável de ambiente STOCKFISH_PATH não está definida")
+
+    load_opening_book_from_games()
+    evaluation_queue.start()
+
+    await asyncio.to_thread(engine_pool.start)
+    warm_up = asyncio.create_task(asyncio.to_thread(engine_pool.warm_up, warm_up_positions()))
+
+    yield
+
+    await warm_up
+    await evaluation_queue.stop()
+    engine_pool.close()
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Pychess",
     description="API com autenticação JWT",
     version="1.0",
@@ -54,6 +96,11 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+@app.exception_handler(EngineUnavailableError)
+async def engine_unavailable_handler(request: Request, exc: EngineUnavailableError):
+    # O motor travou ou caiu duas vezes seguidas: o cliente pode tentar de novo em seguida
+    return JSONResponse(content={"detail": str(exc)}, status_code=503)
+
 # Configurar os domínios permitidos (origens permitidas)
 origins = [
     "http://localhost:3000",
@@ -74,6 +121,9 @@ app_socket = socketio.ASGIApp(sio, other_asgi_app=app)
 with open("game-states.json", 'r') as file:
     game_states = json.load(file)
 
+# Status de partidas encerradas
+FINISHED_STATES = [game_states["PLAYER_WIN"], game_states["AI_WIN"], game_states["DRAW"]]
+
 def custom_openapi():
     if app.openapi_schema:
         return app.openapi_schema
@@ -101,18 +151,128 @@ app.openapi = custom_openapi
 load_dotenv(override=True)
 
 STOCKFISH_PATH = os.getenv("STOCKFISH_PATH")
+STOCKFISH_POOL_SIZE = int(os.getenv("STOCKFISH_POOL_SIZE", os.cpu_count() or 1))
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", 50000))
+ANALYSIS_MULTIPV = int(os.getenv("ANALYSIS_MULTIPV", 3))
+# Faixa de profundidades consideradas pela avaliação em segundo plano
+EVALUATION_MIN_DEPTH = 8
+EVALUATION_MAX_DEPTH = 12
+EVALUATION_QUEUE_SIZE = int(os.getenv("EVALUATION_QUEUE_SIZE", 100))
+EVALUATION_WORKERS = int(os.getenv("EVALUATION_WORKERS", 1))
+OPENING_BOOK_PATH = os.getenv("OPENING_BOOK_PATH")  # Livro Polyglot (.bin) opcional
+OPENING_BOOK_MAX_PLY = int(os.getenv("OPENING_BOOK_MAX_PLY", 12))
+OPENING_BOOK_FROM_GAMES = os.getenv("OPENING_BOOK_FROM_GAMES", "false").lower() == "true"
+SYZYGY_PATH = os.getenv("SYZYGY_PATH")  # Diretório(s) das tablebases Syzygy (opcional)
+SYZYGY_MAX_PIECES = os.getenv("SYZYGY_MAX_PIECES")
+ENGINE_AFFINITY_TIMEOUT = float(os.getenv("ENGINE_AFFINITY_TIMEOUT", 600))  # Segundos sem jogada até o jogo perder o motor
+ENGINE_WARMUP = os.getenv("ENGINE_WARMUP", "true").lower() == "true"
+ENGINE_PONDER = os.getenv("ENGINE_PONDER", "false").lower() == "true"  # Motor pensa na vez do jogador
+ENGINE_CALL_TIMEOUT = float(os.getenv("ENGINE_CALL_TIMEOUT", 30))  # Prazo (s) de cada chamada antes de reiniciar o motor
+ENGINE_READY_TIMEOUT = float(os.getenv("ENGINE_READY_TIMEOUT", 60))  # Espera (s) por um motor durante o aquecimento antes do 503
+ACTIVE_GAME_CACHE_SIZE = int(os.getenv("ACTIVE_GAME_CACHE_SIZE", 10000))
+ACTIVE_GAME_IDLE_TIMEOUT = float(os.getenv("ACTIVE_GAME_IDLE_TIMEOUT", 1800))  # Segundos sem jogada até o jogo sair da memória
+REPLAY_CACHE_SIZE = int(os.getenv("REPLAY_CACHE_SIZE", 1000))
+BATCH_ANALYSIS_MAX_POSITIONS = int(os.getenv("BATCH_ANALYSIS_MAX_POSITIONS", 5000))
+SPECULATIVE_TOP_K = int(os.getenv("SPECULATIVE_TOP_K", 0))  # Jogadas do jogador com resposta pré-calculada (0 desliga)
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 
-if not STOCKFISH_PATH:
-    raise ValueError("A variável de ambiente STOCKFISH_PATH não está definida")
+# Aberturas buscadas no aquecimento: carregam a rede do motor e já deixam as primeiras respostas no cache
+WARMUP_OPENINGS = [
+    [],
+    ["e2e4", "e7e6", "d2d4"],
+    ["d2d4", "e7e6", "c2c4"],
+]
 
 security = HTTPBearer()
 
-# Inicializa o motor Stockfish
-stockfish = Stockfish(STOCKFISH_PATH)
-stockfish.set_skill_level(10)  # Ajuste o nível de habilidade (0-20)
-stockfish.set_depth(15)  # Profundidade de busca
+# Cache de análises compartilhado: posições repetidas (ex.: aberturas) não voltam ao motor
+analysis_cache = AnalysisCache(maxsize=ANALYSIS_CACHE_SIZE)
+
+# Jogadas do mesmo jogo são processadas uma de cada vez; jogos diferentes rodam em paralelo
+game_locks = GameLocks()
+
+# Estado dos jogos em andamento em memória: uma jogada não precisa ler o banco
+game_cache = ActiveGameCache(maxsize=ACTIVE_GAME_CACHE_SIZE, idle_timeout=ACTIVE_GAME_IDLE_TIMEOUT)
+
+# Posições das partidas encerradas: o replay é calculado uma vez por partida
+replay_cache = ReplayCache(maxsize=REPLAY_CACHE_SIZE)
+
+# Avaliações persistidas no banco: sobrevivem a reinícios e só são refeitas se for preciso ir mais fundo
+evaluation_store = EvaluationStore()
+
+# 🔧 Jogada das pretas fixa para a primeira vez que o Stockfish joga (entrada padrão do livro)
+FORCED_FIRST_BLACK_MOVE = "e7e6"
+
+# Livro de aberturas: jogadas conhecidas saem do livro, sem busca no motor
+opening_book = OpeningBook(max_ply=OPENING_BOOK_MAX_PLY)
+for first_move in chess.Board().legal_moves:
+    first_board = chess.Board()
+    first_board.push(first_move)
+    opening_book.add(first_board, FORCED_FIRST_BLACK_MOVE)
+
+if OPENING_BOOK_PATH:
+    opening_book.load_polyglot(OPENING_BOOK_PATH)
+
+# Tablebases de finais: posições com poucas peças são respondidas de forma exata, sem busca
+tablebase = None
+if SYZYGY_PATH:
+    tablebase = Tablebase(SYZYGY_PATH, max_pieces=int(SYZYGY_MAX_PIECES) if SYZYGY_MAX_PIECES else None)
+
+# Pool de motores Stockfish (um processo por busca simultânea); os processos sobem no lifespan
+engine_pool = EnginePool(
+    STOCKFISH_PATH,
+    size=STOCKFISH_POOL_SIZE,
+    skill_level=10,  # Ajuste o nível de habilidade (0-20)
+    depth=15,  # Profundidade de busca
+    cache=analysis_cache,
+    store=evaluation_store,
+    multipv=ANALYSIS_MULTIPV,  # Linhas analisadas por busca ao classificar uma jogada
+    tablebase=tablebase,
+    syzygy_path=SYZYGY_PATH,
+    affinity_timeout=ENGINE_AFFINITY_TIMEOUT,
+    ponder=ENGINE_PONDER,
+    call_timeout=ENGINE_CALL_TIMEOUT,
+    ready_timeout=ENGINE_READY_TIMEOUT
+)
+
+# Respostas da IA pré-calculadas com motores ociosos para as jogadas mais prováveis do jogador
+speculator = SpeculativeScheduler(engine_pool, book=opening_book, top_k=SPECULATIVE_TOP_K)
+
+def warm_up_positions() -> list[chess.Board]:
+    """Posições buscadas no aquecimento de cada motor (início da partida e aberturas comuns)."""
+    if not ENGINE_WARMUP:
+        return []
+
+    boards = []
+    for moves in WARMUP_OPENINGS:
+        board = chess.Board()
+        for move in moves:
+            board.push_uci(move)
+        boards.append(board)
+    return boards
+
+def load_opening_book_from_games():
+    """Soma ao livro de aberturas as jogadas iniciais das partidas encerradas."""
+    if not OPENING_BOOK_FROM_GAMES:
+        return
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Move.game_id, Move.move)
+            .join(Game, Game.id == Move.game_id)
+            .filter(Game.status.in_(FINISHED_STATES))
+            .order_by(Move.game_id, Move.id)
+            .all()
+        )
+    finally:
+        db.close()
+
+    games = {}
+    for game_id, move in rows:
+        games.setdefault(game_id, []).append(move)
+    opening_book.add_games(games.values())
 
 # Variável para armazenar o histórico do jogo
 board = chess.Board()
@@ -152,24 +312,83 @@ def send_reset_email(email: str, token: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao enviar e-mail: {str(e)}")
 
-# Lista global para armazenar até 3 últimas partidas
-game_history = []
-
 def fen_to_matrix(fen):
     """Converte um FEN em uma matriz 8x8 representando o tabuleiro."""
-    rows = fen.split(" ")[0].split("/")  # Pegamos apenas a parte do tabuleiro no FEN
-    board_matrix = []
-
-    for row in rows:
-        board_row = []
-        for char in row:
-            if char.isdigit():
-                board_row.extend(["."] * int(char))  # Espaços vazios
-            else:
-                board_row.append(char)  # Peça
-        board_matrix.append(board_row)
+    return board_matrix(chess.Board(fen))
+
+def board_from_moves(moves):
+    """Reconstrói o tabuleiro a partir de uma lista de jogadas UCI (a jogada vazia inicial é ignorada)."""
+    board = chess.Board()
+    for move in moves:
+        if move:
+            board.push_uci(move)
+    return board
+
+def find_game(db: Session, game_id: int | None = None, user_id: int | None = None, status_code: int = 400) -> Game:
+    """Jogo da requisição: o de ``game_id`` ou, sem ele, o jogo em andamento mais recente de ``user_id``.
+
+    Com os dois, o jogo precisa ser do usuário. Nunca escolhe "o" jogo em
+    andamento do servidor: vários usuários jogam ao mesmo tempo.
+    """
+    if game_id is not None:
+        query = db.query(Game).filter(Game.id == game_id)
+        if user_id is not None:
+            query = query.filter(Game.user_id == user_id)
+        game = query.first()
+        if not game:
+            raise HTTPException(status_code=404, detail="Jogo não encontrado.")
+        return game
+
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="Informe o game_id ou o user_id.")
+
+    game = queries.user_games(db, user_id, game_states["IN_PROGRESS"]).first()
+    if not game:
+        raise HTTPException(status_code=status_code, detail="Nenhum jogo ativo encontrado!")
+    return game
+
+def evaluation_response(evaluation: Evaluation) -> dict:
+    return {
+        "evaluation": evaluation.evaluation,
+        "best_depth": evaluation.depth,
+        "win_probability_white": evaluation.win_probability_white,
+        "win_probability_black": evaluation.win_probability_black,
+        "last_updated": evaluation.last_updated,
+    }
+
+def cached_game(game_id: int | None = None, user_id: int | None = None) -> ActiveGame | None:
+    """Jogo em andamento da requisição, se estiver em memória (e for do usuário, quando informado)."""
+    if game_id is not None:
+        active = game_cache.get(game_id)
+    elif user_id is not None:
+        active = game_cache.for_user(user_id)
+    else:
+        return None
+
+    if active is not None and user_id is not None and active.user_id != user_id:
+        return None
+    return active
+
+def get_active_game(db: Session, game_id: int | None = None, user_id: int | None = None) -> ActiveGame:
+    """Como ``find_game``, mas para jogos em andamento: vem da memória e só lê o banco na primeira vez."""
+    active = cached_game(game_id, user_id)
+    if active is not None:
+        return active
+
+    game = find_game(db, game_id, user_id)
+    if game.status != game_states["IN_PROGRESS"]:
+        raise HTTPException(status_code=400, detail="Nenhum jogo ativo encontrado!")
 
-    return board_matrix
+    moves = queries.game_moves(db, game.id, Move.move, Move.board_string).all()
+    evaluation = queries.game_evaluation(db, game.id).first()
+    return game_cache.load(game, moves, evaluation_response(evaluation) if evaluation else None)
+
+def is_legal_move(board, move):
+    """Verifica se a jogada UCI é válida na posição do tabuleiro."""
+    try:
+        return chess.Move.from_uci(move) in board.legal_moves
+    except ValueError:
+        return False
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
     token = credentials.credentials
@@ -191,35 +410,103 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Security(securi
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-@app.post("/set_difficulty/",tags=['GAME'])
-def set_difficulty(level: str):
-    """Define o nível de dificuldade do Stockfish"""
-    
-    difficulty_settings = {
-        "muito_baixa": {"skill": 1, "depth": 2, "rating": 150},
-        "baixa": {"skill": 2, "depth": 4, "rating": 300},
-        "media": {"skill": 5, "depth": 8, "rating": 600},
-        "dificil": {"skill": 10, "depth": 14, "rating": 1200},
-        "extremo": {"skill": 20, "depth": 22, "rating": "MAX"}
-    }
+# Perfis de dificuldade: além de nível e profundidade, cada um tem orçamento de tempo (s) e de nós,
+# e um teto de tempo real (max_time) que garante a latência da jogada da IA
+DIFFICULTY_SETTINGS = {
+    "muito_baixa": {"skill": 1, "depth": 2, "movetime": None, "nodes": 5000, "max_time": 0.5, "rating": 150},
+    "baixa": {"skill": 2, "depth": 4, "movetime": None, "nodes": 20000, "max_time": 0.5, "rating": 300},
+    "media": {"skill": 5, "depth": 8, "movetime": 0.3, "nodes": 200000, "max_time": 1, "rating": 600},
+    "dificil": {"skill": 10, "depth": 14, "movetime": 0.8, "nodes": 1000000, "max_time": 2, "rating": 1200},
+    "extremo": {"skill": 20, "depth": 22, "movetime": 2, "nodes": None, "max_time": 4, "rating": "MAX"}
+}
+
+# Cada nível vira um perfil do pool: a dificuldade é aplicada por busca, sem mexer nos padrões globais
+for difficulty_level, difficulty in DIFFICULTY_SETTINGS.items():
+    engine_pool.add_profile(
+        difficulty_level,
+        difficulty["skill"],
+        difficulty["depth"],
+        movetime=difficulty["movetime"],
+        nodes=difficulty["nodes"],
+        max_time=difficulty["max_time"]
+    )
+
+# Nível dos próximos jogos quando set_difficulty é chamado sem jogo em andamento (None: padrões do pool)
+default_difficulty: Optional[str] = None
 
+def parse_difficulty(level: str) -> str:
     level = level.lower()
-    
-    if level not in difficulty_settings:
+    if level not in DIFFICULTY_SETTINGS:
         raise HTTPException(status_code=400, detail="Nível inválido! Escolha entre: muito_baixa, baixa, media, dificil, extremo.")
+    return level
+
+@app.post("/set_difficulty/",tags=['GAME'])
+def set_difficulty(level: str, game_id: Optional[int] = None, user_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """Define o nível de dificuldade do Stockfish para um jogo.
 
-    settings = difficulty_settings[level]
+    O jogo é o de ``game_id`` ou o jogo em andamento de ``user_id``; sem
+    nenhum dos dois, vira o nível dos próximos jogos criados. Os outros
+    jogos não são afetados.
+    """
+    global default_difficulty
 
-    stockfish.set_skill_level(settings["skill"])
-    stockfish.set_depth(settings["depth"])
+    level = parse_difficulty(level)
+    settings = DIFFICULTY_SETTINGS[level]
+
+    game = None
+    if game_id is not None or user_id is not None:
+        game = find_game(db, game_id, user_id)
+
+    if game:
+        game.difficulty = level
+        db.commit()
+        active = game_cache.get(game.id)
+        if active is not None:
+            active.difficulty = level
+    else:
+        default_difficulty = level
 
     return {
         "message": f"Dificuldade ajustada para '{level}'",
+        "game_id": game.id if game else None,
         "skill_level": settings["skill"],
         "depth": settings["depth"],
+        "movetime": settings["movetime"],
+        "nodes": settings["nodes"],
+        "max_time": settings["max_time"],
         "rating": settings["rating"]
     }
 
+@app.get("/ready", tags=['ENGINE'])
+def ready():
+    """Probe de prontidão: só responde 200 depois que os motores foram aquecidos."""
+    if not engine_pool.ready:
+        return JSONResponse(content={"status": "warming_up"}, status_code=503)
+
+    return {"status": "ready", "engines": engine_pool.size}
+
+@app.get("/engine_stats/", tags=['ENGINE'])
+def engine_stats():
+    """Retorna o uso do pool de motores e a taxa de acerto do cache de análises."""
+    return {
+        "pool_size": engine_pool.size,
+        "engines_available": engine_pool.available,
+        "engine_affinity": engine_pool.affinity_stats(),
+        "ponder": engine_pool.ponder_stats(),
+        "speculation": speculator.stats(),
+        "opening_book": opening_book.stats(),
+        "tablebase": tablebase.stats() if tablebase else None,
+        "search_timeouts": engine_pool.timeouts,
+        "engine_profiles": engine_pool.profile_stats(),
+        "watchdog": engine_pool.watchdog_stats(),
+        "game_locks": game_locks.stats(),
+        "active_games": game_cache.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "replay_cache": replay_cache.stats(),
+        "evaluation_store": evaluation_store.stats(),
+        "evaluation_queue": evaluation_queue.stats()
+    }
+
 # @app.post("/finish_game/")
 # def finish_game(
 #     user_id: int = Query(..., description="ID do usuário logado"),
@@ -248,31 +535,34 @@ def set_difficulty(level: str):
 #     return {"message": f"Partida finalizada. Vencedor: {winner}", "game_id": game.id, "status": game.status}
 
 @app.post("/start_game/", tags=['GAME'])
-def start_game(user_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def start_game(user_id: int, background_tasks: BackgroundTasks, level: Optional[str] = None, db: Session = Depends(get_db)):
     """ Inicia um novo jogo de xadrez e registra a posição inicial. """
+    difficulty = parse_difficulty(level) if level else default_difficulty
     
-    # Verifica se há algum jogo em andamento
-    existing_game = db.query(Game).filter(Game.status == game_states["IN_PROGRESS"]).first()
+    # Cada usuário tem no máximo um jogo em andamento (outros usuários podem estar jogando ao mesmo tempo)
+    existing_game = queries.user_games(db, user_id, game_states["IN_PROGRESS"], Game.id).first()
     if existing_game:
         raise HTTPException(status_code=400, detail="Já existe um jogo em andamento!")
 
     # Criar um novo jogo
     new_game = Game(
         user_id=user_id,
-        begin_time=datetime.now()  # ✅ Corrigido: passa datetime, não string
+        begin_time=datetime.now(),  # ✅ Corrigido: passa datetime, não string
+        difficulty=difficulty
     )
     db.add(new_game)
     db.commit()
     db.refresh(new_game)
 
-    # Iniciar posição no Stockfish
-    stockfish.set_position([])  # posição inicial padrão
+    # Posição inicial (o desenho sai do python-chess, sem ocupar um motor)
+    initial_board = chess.Board()  # posição inicial padrão
+    initial_fen = initial_board.fen()
 
     # Criar jogada inicial na tabela moves
     initial_move = Move(
         is_player=None,  # Nenhuma jogada ainda
         move="",  # Movimento vazio (início do jogo)
-        board_string=stockfish.get_fen_position(),  # FEN da posição inicial
+        board_string=initial_fen,  # FEN da posição inicial
         mv_quality=None,  # Não se aplica ainda
         game_id=new_game.id
     )
@@ -290,10 +580,12 @@ def start_game(user_id: int, background_tasks: BackgroundTasks, db: Session = De
     db.add(new_eval)
     db.commit()
 
+    game_cache.put(ActiveGame(new_game.id, user_id, initial_board, difficulty))
+
     return {
         "message": "Jogo iniciado!",
         "game_id": new_game.id,
-        "board": stockfish.get_board_visual()
+        "board": board_visual(initial_board)
     }
 
 @app.post("/load_game/", tags=['GAME'])
@@ -307,15 +599,15 @@ def load_game(game_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Jogo não encontrado!")
 
     # Obtém os movimentos associados ao jogo, ordenados pela sequência correta
-    moves = db.query(Move.move).filter(Move.game_id == game.id).order_by(Move.id).all()
+    moves = queries.game_moves(db, game.id, Move.move).all()
     moves = [m.move for m in moves]  # Converte para uma lista de strings
 
-    # Configura o Stockfish com os movimentos do jogo carregado
-    stockfish.set_position(moves)
+    # Reconstrói o tabuleiro com os movimentos do jogo carregado
+    visual = board_visual(board_from_moves(moves))
 
     return {
         "message": f"Jogo {game_id} carregado!",
-        "board": stockfish.get_board_visual().split("\n")  # Divide em linhas para exibição
+        "board": visual.split("\n")  # Divide em linhas para exibição
     }
 
 @app.get("/game_state_per_moviment/", tags=['GAME'])
@@ -328,24 +620,15 @@ def get_game_state_per_moviment(game_id: int, move_number: int, db: Session = De
         raise HTTPException(status_code=404, detail="Jogo não encontrado!")
 
     # Obtém os movimentos até o número especificado
-    moves = (
-        db.query(Move.move)
-        .filter(Move.game_id == game.id)
-        .order_by(Move.id)
-        .limit(move_number)
-        .all()
-    )
+    moves = queries.game_moves(db, game.id, Move.move).limit(move_number).all()
     moves = [m.move for m in moves]  # Converte para lista de strings
 
     # Se não houver jogadas, retorna o tabuleiro inicial
-    if not moves:
-        stockfish.set_position([])  # Reseta o tabuleiro
-    else:
-        stockfish.set_position(moves)
+    visual = board_visual(board_from_moves(moves))
 
     return {
         "message": f"Jogo {game_id} após {move_number} jogadas.",
-        "board": stockfish.get_board_visual().split("\n")  # Divide para exibição
+        "board": visual.split("\n")  # Divide para exibição
     }
 
 @app.get("/game_moves/{game_id}", tags=["GAME"])
@@ -354,45 +637,107 @@ def get_game_moves_by_id(game_id: int, db: Session = Depends(get_db)):
     if not game:
         raise HTTPException(status_code=404, detail="Jogo não encontrado.")
 
-    moves = db.query(Move).filter(Move.game_id == game.id).order_by(Move.id).all()
+    moves = queries.game_moves(db, game.id).all()
     move_list = [m.move for m in moves]
 
     return {"moves": move_list}
 
-@app.get("/game_board/", tags=['GAME'])
-def get_game_board(db: Session = Depends(get_db)):
-    """ Retorna a visualização do tabuleiro baseado no último estado salvo no banco. """
+@app.get("/games/{game_id}/positions", tags=["GAME"])
+def get_game_positions(
+    game_id: int,
+    start: Optional[int] = Query(None, ge=0, description="Primeiro meio-lance retornado (0 = posição inicial)"),
+    end: Optional[int] = Query(None, ge=0, description="Meio-lance final, exclusivo"),
+    db: Session = Depends(get_db)
+):
+    """Retorna a posição (FEN), a jogada em SAN e a classificação de cada meio-lance da partida.
 
-    # Obtém o último jogo ativo e seu último movimento em uma única consulta
-    last_game = (
-        db.query(Game.id, Move.board_string)
-        .join(Move, Move.game_id == Game.id)
-        .filter(Game.status == game_states["IN_PROGRESS"])
-        .order_by(Game.id.desc(), Move.id.desc())
-        .first()
+    As jogadas são lidas numa única consulta e percorridas uma vez; o
+    resultado de partidas encerradas fica em cache. ``start`` e ``end``
+    recortam o intervalo de meios-lances.
+    """
+    game = db.query(Game.id, Game.status).filter(Game.id == game_id).first()
+    if not game:
+        raise HTTPException(status_code=404, detail="Jogo não encontrado.")
+
+    finished = game.status in FINISHED_STATES
+    positions = replay_cache.get(game_id) if finished else None
+    if positions is None:
+        moves = queries.game_moves(db, game_id, Move.move, Move.mv_quality, Move.is_player).all()
+        try:
+            positions = replay_positions(moves)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if finished:
+            replay_cache.put(game_id, positions)
+
+    return {
+        "game_id": game_id,
+        "status": game.status,
+        "total_plies": len(positions) - 1,
+        "positions": positions[start:end]
+    }
+
+@app.get("/games/export.pgn", tags=["GAME"])
+def export_games_pgn(
+    user_id: Optional[int] = Query(None, description="Só as partidas deste usuário"),
+    status: Optional[str] = Query(None, description="in_progress, player_win, ai_win ou draw"),
+    date_from: Optional[datetime] = Query(None, description="Partidas iniciadas a partir desta data"),
+    date_to: Optional[datetime] = Query(None, description="Partidas iniciadas até esta data"),
+):
+    """Exporta as partidas filtradas em PGN, enviadas uma a uma à medida que são lidas do banco."""
+    if status is not None and status not in game_states.values():
+        raise HTTPException(status_code=400, detail="Status inválido.")
+
+    # A sessão é aberta pelo próprio gerador: a de get_db já estaria fechada durante o streaming
+    return StreamingResponse(
+        export_games(SessionLocal, user_id=user_id, status=status, date_from=date_from, date_to=date_to),
+        media_type="application/x-chess-pgn",
+        headers={"Content-Disposition": 'attachment; filename="games.pgn"'},
     )
 
-    if not last_game:
+@app.post("/games/import", tags=["GAME"])
+async def import_games_pgn(request: Request, user_id: int = Query(..., description="Usuário dono das partidas importadas"),
+                           db: Session = Depends(get_db)):
+    """Importa partidas de um PGN enviado no corpo da requisição (Content-Type: application/x-chess-pgn).
+
+    O corpo é recebido em partes e vai para o disco se for grande; as
+    partidas são lidas uma a uma e gravadas em lotes.
+    """
+    if not db.query(User.id).filter(User.id == user_id).first():
+        raise HTTPException(status_code=404, detail="Usuário não encontrado.")
+
+    with SpooledTemporaryFile(max_size=8 * 1024 * 1024) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        result = await asyncio.to_thread(import_games, db, upload, user_id)
+
+    return {"message": "Importação concluída!", **result}
+
+@app.get("/game_board/", tags=['GAME'])
+def get_game_board(game_id: Optional[int] = None, user_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """ Retorna a visualização do tabuleiro do jogo (``game_id`` ou o jogo ativo de ``user_id``) no último estado salvo. """
+
+    game = find_game(db, game_id, user_id, status_code=404)
+    last_move = queries.last_move(db, game.id).first()
+
+    if not last_move:
         raise HTTPException(status_code=404, detail="Nenhum jogo ativo ou jogada encontrada.")
 
-    game_id, fen_string = last_game
+    fen_string = last_move.board_string
 
-    # Validação do FEN antes de enviar para o Stockfish
+    # Validação do FEN antes de desenhar o tabuleiro
     if not fen_string or len(fen_string.split()) != 6:
         raise HTTPException(status_code=400, detail="FEN inválido no banco de dados.")
 
-    # Define a posição no Stockfish
     try:
-        stockfish.set_fen_position(fen_string)
-        board_visual = stockfish.get_board_visual()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao processar tabuleiro: {str(e)}")
-
-    if not board_visual:
-        raise HTTPException(status_code=500, detail="Falha ao gerar visualização do tabuleiro.")
+        board = chess.Board(fen_string)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"FEN inválido no banco de dados: {str(e)}")
 
     return {
-        "board": board_visual.split("\n"),
+        "board": board_visual(board).split("\n"),
+        "matrix": board_matrix(board),
         "fen": fen_string
     }
 
@@ -430,20 +775,25 @@ class MoveData(BaseModel):
 @app.post("/register_move/", tags=["GAME"])
 async def register_move(
     moves: List[MoveData],
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     user_id: int = Query(..., description="ID do usuário logado"),
     winner: str | None = Query(None, description="Pode ser 'PLAYER' ou 'AI'"),
+    game_id: Optional[int] = Query(None, description="ID do jogo (padrão: o jogo em andamento do usuário)"),
 ):
     """
     Registra várias jogadas de uma só vez e finaliza o jogo (opcionalmente com o vencedor).
     """
     # ✅ Busca jogo ativo
-    game = db.query(Game).filter(
-        Game.user_id == user_id,
-        Game.status == game_states["IN_PROGRESS"]
-    ).first()
+    game = find_game(db, game_id, user_id)
 
-    if not game:
+    async with game_locks.lock(game.id):
+        return register_game_moves(game, moves, winner, background_tasks, db)
+
+def register_game_moves(game: Game, moves: List[MoveData], winner: str | None, background_tasks: BackgroundTasks, db: Session):
+    # O jogo pode ter terminado enquanto a requisição esperava o lock
+    db.refresh(game)
+    if game.status != game_states["IN_PROGRESS"]:
         raise HTTPException(status_code=400, detail="Nenhum jogo ativo encontrado.")
 
     # ✅ Cria os registros de jogadas
@@ -459,6 +809,9 @@ async def register_move(
 
     db.commit()
 
+    # As jogadas vêm do cliente: o jogo em memória é recarregado do banco na próxima requisição
+    game_cache.discard(game.id)
+
     # ✅ Atualiza o status do jogo e a data de término
     if winner:
         if winner.upper() == "PLAYER":
@@ -469,6 +822,11 @@ async def register_move(
         game.end_time = datetime.now()  # ✅ Marca quando o jogo terminou
         db.commit()
 
+        # Resumo da partida calculado uma única vez, ao encerrar
+        engine_pool.release(game.id)
+        speculator.discard(game.id)
+        background_tasks.add_task(save_game_summary, game.id)
+
     return {
         "message": f"{len(moves)} jogadas registradas com sucesso!",
         "game_id": game.id,
@@ -482,28 +840,51 @@ async def play_game(
     move: str,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    user_id: int = Query(..., description="ID do usuário logado")
+    user_id: int = Query(..., description="ID do usuário logado"),
+    game_id: Optional[int] = Query(None, description="ID do jogo (padrão: o jogo em andamento do usuário)")
 ):
-    """ O usuário joga, e o Stockfish responde. A primeira jogada das pretas é forçada. """
-
-    # 🔧 Jogada das pretas fixa para a primeira vez que o Stockfish joga
-    FORCED_FIRST_BLACK_MOVE = "e7e6"
+    """ O usuário joga, e o Stockfish responde. Na abertura, a resposta das pretas sai do livro de aberturas. """
 
     # -----------------------------------------------------------
-    # Carregar jogo
+    # Carregar jogo (da memória; o banco só é lido se o jogo não estiver lá)
     # -----------------------------------------------------------
-    game = db.query(Game).filter(
-        Game.user_id == user_id,
-        Game.status == game_states["IN_PROGRESS"]
-    ).first()
-
-    if not game:
-        raise HTTPException(status_code=400, detail="Nenhum jogo ativo encontrado!")
+    active = get_active_game(db, game_id, user_id)
+
+    # Uma jogada por vez em cada jogo: duas requisições simultâneas partiriam do mesmo estado
+    async with game_locks.lock(active.game_id):
+        # Enquanto a requisição esperava o lock, o jogo pode ter terminado ou ter saído da memória:
+        # nesse caso é recarregado do banco (e recusado, se não estiver mais em andamento)
+        if active.finished or game_cache.get(active.game_id) is not active:
+            active = get_active_game(db, active.game_id)
+        return await play_turn(active, move, background_tasks, db)
+
+def save_game_move(active: ActiveGame, board: chess.Board, move: str, is_player: bool, db: Session,
+                   mv_quality: str | None = None):
+    """Grava a jogada no banco e só então atualiza o jogo em memória (write-through)."""
+    db.add(Move(
+        is_player=is_player,
+        move=move,
+        board_string=board.fen(),
+        mv_quality=mv_quality,
+        game_id=active.game_id,
+        created_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    ))
+    db.commit()
+    active.board = board.copy()
 
-    # Último estado salvo
-    last_move = db.query(Move).filter(Move.game_id == game.id).order_by(Move.id.desc()).first()
+async def finish_active_game(active: ActiveGame, status: str, background_tasks: BackgroundTasks, db: Session):
+    """Encerra o jogo por xeque-mate: rating, status no banco e remoção do jogo da memória."""
+    await asyncio.to_thread(rating, active.user_id, active.game_id, db)
+    db.query(Game).filter(Game.id == active.game_id).update({Game.status: status})
+    db.commit()
+    game_cache.finish(active.game_id)
+    engine_pool.release(active.game_id)
+    speculator.discard(active.game_id)
+    background_tasks.add_task(save_game_summary, active.game_id)
 
-    board = chess.Board(last_move.board_string) if last_move else chess.Board()
+async def play_turn(active: ActiveGame, move: str, background_tasks: BackgroundTasks, db: Session):
+    """Jogada do usuário e resposta do Stockfish num jogo em andamento (chamada com o lock do jogo)."""
+    board = active.board.copy()
 
     # -----------------------------------------------------------
     # Jogada do player
@@ -511,30 +892,16 @@ async def play_game(
     if move not in [m.uci() for m in board.legal_moves]:
         raise HTTPException(status_code=400, detail="Movimento do jogador inválido!")
 
-    board.push(chess.Move.from_uci(move))
-    stockfish.set_fen_position(board.fen())
-
     # Classificação do movimento
-    analysis = analyze_move(move, db)
+    analysis = await analyze_board_move(active.game_id, board.copy(), move)
     classification = analysis["classification"]
 
-    # Salvar jogada do jogador
-    new_move = Move(
-        is_player=True,
-        move=move,
-        board_string=board.fen(),
-        mv_quality=classification,
-        game_id=game.id,
-        created_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    )
-    db.add(new_move)
-    db.commit()
+    board.push(chess.Move.from_uci(move))
 
     # Verifica xeque-mate do jogador
     if board.is_checkmate():
-        game.status = game_states["PLAYER_WIN"]
-        db.commit()
-        rating(game.user_id)
+        save_game_move(active, board, move, True, db, mv_quality=classification)
+        await finish_active_game(active, game_states["PLAYER_WIN"], background_tasks, db)
 
         return {
             "message": "Xeque-mate! Brancas venceram!",
@@ -547,41 +914,28 @@ async def play_game(
     # -----------------------------------------------------------
     # Jogada do Stockfish (PRETAS)
     # -----------------------------------------------------------
-    total_moves = db.query(Move).filter(Move.game_id == game.id).count()
-
-    # Jogada forçada das pretas
-    print(f'total moves: {total_moves}, do tipo {type(total_moves)}')
-    # stockfish_move_uci = FORCED_FIRST_BLACK_MOVE
-    if total_moves <= 2:
-        # Jogada forçada das pretas
-        stockfish_move_uci = FORCED_FIRST_BLACK_MOVE
-    else:
-        # Jogada normal do Stockfish
-        stockfish_move_uci = stockfish.get_best_move()
+    # Escolhida antes de gravar a jogada do jogador: se o motor falhar, o jogo continua na vez do jogador
+    # Jogada do livro de aberturas (inclui a primeira jogada forçada das pretas)
+    stockfish_move_uci = opening_book.choose(board) or speculator.lookup(active.game_id, board, active.difficulty)
+    if stockfish_move_uci is None:
+        # Jogada normal do Stockfish (aguarda a busca sem bloquear o event loop), no motor vinculado ao jogo e no nível dele
+        async with engine_pool.acquire(game_id=active.game_id, play=True, profile=active.difficulty) as stockfish:
+            stockfish_move_uci = await stockfish.get_best_move_async(board)
+
+    # Salvar jogada do jogador
+    save_game_move(active, board, move, True, db, mv_quality=classification)
 
     stockfish_move = chess.Move.from_uci(stockfish_move_uci)
 
     # Aplica direto SEM verificações adicionais
     board.push(stockfish_move)
-    stockfish.set_fen_position(board.fen())
 
     # Salvar jogada do Stockfish
-    sf_move = Move(
-        is_player=False,
-        move=stockfish_move_uci,
-        board_string=board.fen(),
-        game_id=game.id,
-        mv_quality=None,
-        created_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    )
-    db.add(sf_move)
-    db.commit()
+    save_game_move(active, board, stockfish_move_uci, False, db)
 
     # Xeque-mate após jogada das pretas
     if board.is_checkmate():
-        game.status = game_states["AI_WIN"]
-        db.commit()
-        rating(game.user_id)
+        await finish_active_game(active, game_states["AI_WIN"], background_tasks, db)
 
         return {
             "message": "Xeque-mate! Pretas venceram!",
@@ -594,9 +948,12 @@ async def play_game(
     # -----------------------------------------------------------
     # Avaliação
     # -----------------------------------------------------------
-    background_tasks.add_task(calculate_and_save_evaluation, game.id, db)
+    evaluation_queue.submit(active.game_id)
 
-    await sio.emit("board_updated")
+    # Enquanto o jogador pensa, motores ociosos pré-calculam as respostas às jogadas mais prováveis
+    speculator.schedule(active.game_id, board, active.difficulty)
+
+    await sio.emit("board_updated", {"game_id": active.game_id})
 
     return {
         "message": "Movimentos realizados!",
@@ -605,34 +962,69 @@ async def play_game(
         "stockfish_move": stockfish_move_uci
     }
 
-def calculate_and_save_evaluation(game_id: int, db: Session):
-    moves = db.query(Move.move).filter(Move.game_id == game_id).order_by(Move.id).all()
-    move_list = [m.move for m in moves]
-    stockfish.set_position(move_list)
+def win_probabilities(evaluation: dict) -> tuple[float, float]:
+    """Probabilidade de vitória (%) das brancas e das pretas a partir da avaliação."""
+    if evaluation["type"] == "mate":
+        if evaluation["value"] > 0:
+            win_white = 100
+        else:
+            win_white = 0
+    else:
+        cp = evaluation["value"]
+        win_white = round((1 / (1 + math.exp(-0.004 * cp))) * 100, 2)
+
+    return win_white, round(100 - win_white, 2)
+
+async def calculate_and_save_evaluation(game_id: int):
+    """Avalia a posição atual do jogo; roda na fila de avaliações, com sessão própria."""
+    db = SessionLocal()
+    try:
+        await _calculate_and_save_evaluation(game_id, db)
+    finally:
+        db.close()
+
+# Fila de avaliações em segundo plano: um job pendente por jogo, sempre da posição mais recente
+evaluation_queue = EvaluationQueue(calculate_and_save_evaluation, maxsize=EVALUATION_QUEUE_SIZE, workers=EVALUATION_WORKERS)
+
+async def _calculate_and_save_evaluation(game_id: int, db: Session):
+    active = game_cache.get(game_id)
+    if active is not None:
+        board = active.board.copy()
+    else:
+        moves = queries.game_moves(db, game_id, Move.move).all()
+        board = board_from_moves([m.move for m in moves])
 
     best_eval = None
     best_depth = 0
 
-    for depth in range(8, 13):
-        stockfish.set_depth(depth)
-        evaluation = stockfish.get_evaluation()
+    # Uma única busca até EVALUATION_MAX_DEPTH: a barra de avaliação é atualizada a cada profundidade concluída
+    async with engine_pool.acquire(game_id=game_id) as stockfish:
+        async for analysis in stockfish.stream_evaluation_async(board, EVALUATION_MAX_DEPTH):
+            evaluation, depth = analysis["score"], analysis["depth"]
+            win_white, win_black = win_probabilities(evaluation)
 
-        if best_eval is None or abs(evaluation["value"]) > abs(best_eval["value"]):
-            best_eval = evaluation
-            best_depth = depth
+            await sio.emit("evaluation_updated", {
+                "game_id": game_id,
+                "evaluation": evaluation["value"],
+                "type": evaluation["type"],
+                "depth": depth,
+                "win_probability_white": win_white,
+                "win_probability_black": win_black
+            })
 
-    if best_eval["type"] == "mate":
-        if best_eval["value"] > 0:
-            win_white = 100
-        else:
-            win_white = 0
-    else:
-        cp = best_eval["value"]
-        win_white = round((1 / (1 + math.exp(-0.004 * cp))) * 100, 2)
+            if depth < EVALUATION_MIN_DEPTH:
+                continue
 
-    win_black = round(100 - win_white, 2)
+            if best_eval is None or abs(evaluation["value"]) > abs(best_eval["value"]):
+                best_eval = evaluation
+                best_depth = depth
 
-    existing = db.query(Evaluation).filter(Evaluation.game_id == game_id).first()
+    if best_eval is None:
+        return  # Posição sem busca (ex.: partida encerrada)
+
+    win_white, win_black = win_probabilities(best_eval)
+
+    existing = queries.game_evaluation(db, game_id).first()
     if existing:
         existing.evaluation = best_eval["value"]
         existing.depth = best_depth
@@ -640,60 +1032,82 @@ def calculate_and_save_evaluation(game_id: int, db: Session):
         existing.win_probability_black = win_black
         existing.last_updated = datetime.utcnow()
     else:
-        new_eval = Evaluation(
+        existing = Evaluation(
             game_id=game_id,
             evaluation=best_eval["value"],
             depth=best_depth,
             win_probability_white=win_white,
             win_probability_black=win_black,
+            last_updated=datetime.utcnow(),
         )
-        db.add(new_eval)
+        db.add(existing)
 
     db.commit()
 
+    # Write-through: /evaluate_position/ passa a responder da memória
+    if active is not None:
+        active.evaluation = evaluation_response(existing)
+
+def save_game_summary(game_id: int, db: Session | None = None):
+    """Analisa uma partida encerrada uma única vez e guarda o resumo (boas jogadas, erros graves e total)."""
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()  # Tarefas em segundo plano não podem usar a sessão da requisição, já fechada
+
+    try:
+        summary = db.query(GameSummary).filter(GameSummary.game_id == game_id).first()
+        if summary:
+            return summary
+
+        game = db.query(Game).filter(Game.id == game_id).first()
+        if not game:
+            return None
+
+        moves = queries.game_moves(db, game_id, Move.move).all()
+
+        with engine_pool.checkout() as stockfish:
+            plies = analyze_game(stockfish, [m.move for m in moves])
+
+        summary = GameSummary(game_id=game_id, user_id=game.user_id, **summarize_game(plies))
+        db.add(summary)
+        db.commit()
+        return summary
+    finally:
+        if own_session:
+            db.close()
+
 @app.get("/evaluate_position/", tags=['GAME'])
-def evaluate_position(db: Session = Depends(get_db)):
-    game = db.query(Game).filter(Game.status == game_states["IN_PROGRESS"]).first()
-    if not game:
-        raise HTTPException(status_code=404, detail="Nenhum jogo ativo encontrado.")
+def evaluate_position(game_id: Optional[int] = None, user_id: Optional[int] = None, db: Session = Depends(get_db)):
+    active = cached_game(game_id, user_id)
+    if active is not None and active.evaluation is not None:
+        return active.evaluation
+
+    game = find_game(db, game_id, user_id, status_code=404)
 
-    evaluation = db.query(Evaluation).filter(Evaluation.game_id == game.id).first()
+    evaluation = queries.game_evaluation(db, game.id).first()
     if not evaluation:
         raise HTTPException(status_code=404, detail="Nenhuma avaliação disponível ainda.")
 
-    return {
-        "evaluation": evaluation.evaluation,
-        "best_depth": evaluation.depth,
-        "win_probability_white": evaluation.win_probability_white,
-        "win_probability_black": evaluation.win_probability_black,
-        "last_updated": evaluation.last_updated,
-    }
+    return evaluation_response(evaluation)
 
 @app.get("/game_moves/", tags=["GAME"])
-def get_game_moves(db: Session = Depends(get_db)):
-    game = db.query(Game).filter(Game.status == game_states["IN_PROGRESS"]).first()
-    if not game:
-        raise HTTPException(status_code=404, detail="Nenhum jogo ativo encontrado.")
-    
-    moves = db.query(Move).filter(Move.game_id == game.id).order_by(Move.id).all()
+def get_game_moves(game_id: Optional[int] = None, user_id: Optional[int] = None, db: Session = Depends(get_db)):
+    game = find_game(db, game_id, user_id, status_code=404)
+
+    moves = queries.game_moves(db, game.id).all()
     move_list = [m.move for m in moves]
     
     return {"moves": move_list}
 
 @app.post("/rating/", tags=['GAME'])
-def rating(user_id: int, db: Session = Depends(get_db)):
-    """Avalia o jogo completo armazenado em game_moves e atualiza o rating do jogador no banco de dados."""
+def rating(user_id: int, game_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """Avalia o jogo completo (``game_id`` ou o jogo em andamento do usuário) e atualiza o rating do jogador no banco de dados."""
 
-    global stockfish
-
-    game = db.query(Game).filter(Game.status == game_states["IN_PROGRESS"]).first()
-
-    if not game:
-        raise HTTPException(status_code=400, detail="Nenhum jogo ativo encontrado!")
+    game = find_game(db, game_id, user_id)
 
     # Obtém os movimentos já registrados no banco para este jogo
     game_moves = db.query(Move.move).filter(Move.game_id == game.id).all()
-    game_moves = [m.move for m in game_moves]  # Transformando em lista de strings
+    game_moves = [m.move for m in game_moves if m.move]  # Transformando em lista de strings (sem a jogada inicial vazia)
 
     # Verifica se há jogadas para avaliar
     if not game_moves:
@@ -707,22 +1121,17 @@ def rating(user_id: int, db: Session = Depends(get_db)):
     base_rating = user.rating  # Rating atual do jogador
     rating = base_rating  # Inicializa o rating com o valor do banco
 
-    stockfish.set_position([])  # Reseta o Stockfish para o início da partida
-
-    for i, move in enumerate(game_moves):
-        if not stockfish.is_move_correct(move):
-            raise HTTPException(status_code=400, detail=f"Movimento inválido detectado: {move}")
+    # Percorre a partida uma única vez: cada posição é buscada só uma vez
+    with engine_pool.checkout(game_id=game.id) as stockfish:
+        try:
+            plies = analyze_game(stockfish, game_moves)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        stockfish.set_position(game_moves[:i + 1])  # Atualiza posição até a jogada atual
+    for ply in plies:
+        eval_diff = ply["score_before"]["value"] - ply["score_after"]["value"]
 
-        best_move = stockfish.get_best_move()  # Melhor jogada segundo Stockfish
-        evaluation_before = stockfish.get_evaluation()  # Avaliação antes do movimento
-        stockfish.make_moves_from_current_position([move])  # Aplica o movimento no Stockfish
-        evaluation_after = stockfish.get_evaluation()  # Avaliação depois do movimento
-        
-        eval_diff = evaluation_before["value"] - evaluation_after["value"]
-
-        if best_move == move:
+        if ply["best_move"] == ply["move"]:
             rating += 50  # Jogada perfeita
         elif eval_diff > 200:
             rating -= 50  # Erro grave (Blunder)
@@ -759,48 +1168,36 @@ def rating(user_id: int, db: Session = Depends(get_db)):
     }
 
 @app.post("/analyze_move/",tags=['GAME'])
-def analyze_move(move: str,  db: Session = Depends(get_db)):
-    """ Analisa a jogada, comparando com a melhor possível. """
-
-     # Verifica se existe um jogo ativo
-    game = db.query(Game).filter(Game.status == game_states["IN_PROGRESS"]).first()
+async def analyze_move(move: str, game_id: Optional[int] = None, user_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """ Analisa a jogada no jogo ``game_id`` (ou no jogo ativo de ``user_id``), comparando com a melhor possível. """
 
-    if not game:
-        raise HTTPException(status_code=400, detail="Nenhum jogo ativo encontrado!")
+    active = get_active_game(db, game_id, user_id)
+    return await analyze_board_move(active.game_id, active.board.copy(), move)
 
-    # Obtém os movimentos já registrados no banco para este jogo
-    game_moves = db.query(Move.move).filter(Move.game_id == game.id).all()
-    game_moves = [m.move for m in game_moves]  # Transformando em lista de strings
-
-    stockfish.set_position(game_moves)
-
-    # Obtém a melhor jogada recomendada pelo Stockfish
-    best_move = stockfish.get_best_move()
-
-    if not stockfish.is_move_correct(move):
+async def analyze_board_move(game_id: int, board: chess.Board, move: str) -> dict:
+    """Classifica a jogada ``move`` na posição ``board`` do jogo, comparando-a com a melhor jogada."""
+    if not is_legal_move(board, move):
         raise HTTPException(status_code=400, detail="Movimento inválido!")
 
-    # Avaliação antes da jogada
-    eval_before = stockfish.get_evaluation()
-    eval_before_score = eval_before["value"] if eval_before["type"] == "cp" else 0
+    async with engine_pool.acquire(game_id=game_id) as stockfish:
+        # Uma única busca MultiPV: melhor jogada, avaliação antes da jogada,
+        # após a melhor jogada (a própria linha principal) e após a jogada do usuário
+        analysis = await stockfish.get_move_analysis_async(board, chess.Move.from_uci(move))
+        best_move = analysis["best_move"]
 
-    # Aplica o movimento do usuário
-    game_moves.append(move)
-    stockfish.set_position(game_moves)
+        # Avaliação antes da jogada
+        eval_before = analysis["score"]
+        eval_before_score = eval_before["value"] if eval_before["type"] == "cp" else 0
 
-    # Avaliação após a jogada
-    eval_after = stockfish.get_evaluation()
-    eval_after_score = eval_after["value"] if eval_after["type"] == "cp" else 0
+        # Avaliação após a jogada
+        eval_after = analysis["move_score"]
+        eval_after_score = eval_after["value"] if eval_after["type"] == "cp" else 0
 
-    # Desfaz o movimento do usuário e testa a melhor jogada do Stockfish
-    game_moves.pop()
-    stockfish.set_position(game_moves)
-    game_moves.append(best_move)
-    stockfish.set_position(game_moves)
+        # Avaliação após a melhor jogada do Stockfish
+        eval_best = analysis["score"]
+        eval_best_score = eval_best["value"] if eval_best["type"] == "cp" else 0
 
-    # Avaliação após a melhor jogada do Stockfish
-    eval_best = stockfish.get_evaluation()
-    eval_best_score = eval_best["value"] if eval_best["type"] == "cp" else 0
+    board.push_uci(best_move)
 
     # Calcula a diferença entre as avaliações
     diff_user = eval_after_score - eval_before_score  # O quanto a jogada do usuário melhorou ou piorou a posição
@@ -808,14 +1205,7 @@ def analyze_move(move: str,  db: Session = Depends(get_db)):
     diff_to_best = diff_user - diff_best  # Diferença entre a jogada do usuário e a melhor jogada
 
     # Classificação da jogada
-    if diff_to_best == 0:
-        classification = "Brilhante 💎"
-    elif -30 <= diff_to_best < 0:
-        classification = "Boa ✅"
-    elif -100 <= diff_to_best < -30:
-        classification = "Ok 🤷"
-    else:
-        classification = "Gafe ❌"
+    classification = classify_move(diff_to_best)
 
     return {
         "move": move,
@@ -824,16 +1214,54 @@ def analyze_move(move: str,  db: Session = Depends(get_db)):
         "evaluation_after": eval_after_score,
         "evaluation_best_move": eval_best_score,
         "classification": classification,
-        "board": stockfish.get_board_visual()
+        "board": board_visual(board)
     }
 
-@app.get("/game_history/",tags=['GAME'])
-def game_history(db: Session = Depends(get_db)):
-    """ Retorna o histórico de jogadas do jogo atual. """
-    game = db.query(Game).filter(Game.status == game_states["IN_PROGRESS"]).first()
+class BatchAnalysisRequest(BaseModel):
+    fens: List[str] = []
+    moves: List[str] = []  # Partida em UCI: analisa a posição inicial e a posição após cada jogada
+    start_fen: Optional[str] = None  # Posição inicial de ``moves`` (padrão: a inicial do xadrez)
+    depth: Optional[int] = None
+    movetime: Optional[float] = None
+    nodes: Optional[int] = None
+
+@app.post("/analysis/batch", tags=['GAME'])
+async def analyze_batch_positions(request: BatchAnalysisRequest):
+    """Analisa várias posições em paralelo com todos os motores do pool.
+
+    A resposta é NDJSON: uma linha por posição, enviada assim que a análise
+    dela fica pronta (fora de ordem; ``index`` indica a posição no lote).
+    A análise é feita no nível máximo, então a jogada é a melhor da linha principal.
+    """
+    try:
+        boards = batch_positions(request.fens, request.moves, request.start_fen)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not boards:
+        raise HTTPException(status_code=400, detail="Informe ao menos um FEN ou uma lista de jogadas.")
+    if len(boards) > BATCH_ANALYSIS_MAX_POSITIONS:
+        raise HTTPException(status_code=400, detail=f"O lote aceita no máximo {BATCH_ANALYSIS_MAX_POSITIONS} posições.")
+
+    async def lines():
+        results = analyze_batch(
+            engine_pool, boards, skill_level=MAX_SKILL_LEVEL, depth=request.depth,
+            movetime=request.movetime, nodes=request.nodes
+        )
+        async for index, analysis in results:
+            line = {"index": index, "fen": boards[index].fen()}
+            if analysis is None:
+                line["error"] = "Falha ao analisar a posição."
+            else:
+                line.update(analysis)
+            yield json.dumps(line) + "\n"
 
-    if not game:
-        raise HTTPException(status_code=400, detail="Nenhum jogo ativo encontrado!")
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/game_history/",tags=['GAME'])
+def game_history(game_id: Optional[int] = None, user_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """ Retorna o histórico de jogadas do jogo (``game_id`` ou o jogo ativo de ``user_id``). """
+    game = find_game(db, game_id, user_id)
 
     # Obtém os movimentos já registrados no banco para este jogo
     game_moves = db.query(Move.move).filter(Move.game_id == game.id).all()
@@ -886,61 +1314,55 @@ async def get_last_game(
     }
 
 @app.post("/evaluate_progress/", tags=['GAME'])
-def evaluate_progress(db: Session = Depends(get_db)):
-    """Compara as três últimas partidas e verifica a evolução do jogador."""
-    global game_history
-
-    game = db.query(Game).filter(Game.status == game_states["IN_PROGRESS"]).first()
-
-    if not game:
-        raise HTTPException(status_code=400, detail="Nenhum jogo ativo encontrado!")
-
-    # Obtém os movimentos já registrados no banco para este jogo
-    game_moves = db.query(Move.move).filter(Move.game_id == game.id).all()
-    game_moves = [m.move for m in game_moves]  # Transformando em lista de strings
-
-    if not game_moves:
-        raise HTTPException(status_code=400, detail="Nenhuma partida registrada para avaliação.")
-
-    # Adiciona a última partida ao histórico
-    if len(game_history) >= 3:
-        game_history.pop(0)  # Remove a mais antiga para manter apenas 3 partidas
-
-    game_history.append(list(game_moves))  # Salva o jogo atual
-
-    if len(game_history) < 3:
-        return {"message": "Ainda não há partidas suficientes para análise. Jogue pelo menos 3 partidas!"}
-
-    def analyze_game(moves):
-        """Analisa uma partida e retorna estatísticas de qualidade."""
-        stockfish.set_position([])
-        good_moves, blunders, total_moves = 0, 0, len(moves)
-
-        for i, move in enumerate(moves):
-            stockfish.set_position(moves[:i + 1])
-
-            best_move = stockfish.get_best_move()
-            evaluation_before = stockfish.get_evaluation()
-            stockfish.make_moves_from_current_position([move])
-            evaluation_after = stockfish.get_evaluation()
+def evaluate_progress(
+    user_id: int | None = Query(None, description="ID do usuário (padrão: dono do jogo game_id)"),
+    games: int = Query(3, ge=2, description="Quantidade de partidas encerradas a comparar"),
+    game_id: int | None = Query(None, description="Jogo cujo dono será avaliado, se user_id não for informado"),
+    db: Session = Depends(get_db)
+):
+    """Compara as últimas partidas encerradas e verifica a evolução do jogador."""
+
+    if user_id is None:
+        user_id = find_game(db, game_id).user_id
+
+    def last_summaries():
+        return (
+            db.query(GameSummary)
+            .filter(GameSummary.user_id == user_id)
+            .order_by(GameSummary.game_id.desc())
+            .limit(games)
+            .all()
+        )
 
-            eval_diff = evaluation_before["value"] - evaluation_after["value"]
+    summaries = last_summaries()
+
+    if len(summaries) < games:
+        # Partidas encerradas sem resumo (ex.: anteriores aos resumos): calcula uma única vez e guarda
+        pending = (
+            db.query(Game.id)
+            .outerjoin(GameSummary, GameSummary.game_id == Game.id)
+            .filter(
+                Game.user_id == user_id,
+                Game.status.in_(FINISHED_STATES),
+                GameSummary.id.is_(None)
+            )
+            .order_by(Game.id.desc())
+            .limit(games)
+            .all()
+        )
+        for (game_id,) in pending:
+            save_game_summary(game_id, db)
 
-            if best_move == move:
-                good_moves += 1  # Jogada perfeita
-            elif eval_diff > 200:
-                blunders += 1  # Erro grave
-            elif eval_diff > 100:
-                blunders += 0.5  # Pequeno erro
+        summaries = last_summaries()
 
-        return {
-            "good_moves": good_moves,
-            "blunders": blunders,
-            "total_moves": total_moves
-        }
+    if len(summaries) < games:
+        return {"message": f"Ainda não há partidas suficientes para análise. Jogue pelo menos {games} partidas!"}
 
-    # Analisa as três últimas partidas
-    analysis = [analyze_game(game) for game in game_history]
+    # Da partida mais antiga para a mais recente
+    analysis = [
+        {"game_id": s.game_id, "good_moves": s.good_moves, "blunders": s.blunders, "total_moves": s.total_moves}
+        for s in reversed(summaries)
+    ]
 
     def calc_percentage_change(old, new):
         """Calcula a porcentagem de mudança entre duas partidas."""
@@ -948,22 +1370,30 @@ def evaluate_progress(db: Session = Depends(get_db)):
             return 100 if new > 0 else 0  # Se não houver referência anterior
         return round(((new - old) / old) * 100, 2)
 
-    # Compara a última partida com as duas anteriores
-    progress = {
-        "improvement_from_last": {
-            "good_moves": calc_percentage_change(analysis[1]["good_moves"], analysis[2]["good_moves"]),
-            "blunders": calc_percentage_change(analysis[1]["blunders"], analysis[2]["blunders"]),
-            "total_moves": calc_percentage_change(analysis[1]["total_moves"], analysis[2]["total_moves"])
-        },
-        "improvement_from_two_games_ago": {
-            "good_moves": calc_percentage_change(analysis[0]["good_moves"], analysis[2]["good_moves"]),
-            "blunders": calc_percentage_change(analysis[0]["blunders"], analysis[2]["blunders"]),
-            "total_moves": calc_percentage_change(analysis[0]["total_moves"], analysis[2]["total_moves"])
+    def compare(old, new):
+        return {
+            "good_moves": calc_percentage_change(old["good_moves"], new["good_moves"]),
+            "blunders": calc_percentage_change(old["blunders"], new["blunders"]),
+            "total_moves": calc_percentage_change(old["total_moves"], new["total_moves"])
         }
+
+    previous = analysis[:-1]
+    average = {
+        key: sum(a[key] for a in previous) / len(previous)
+        for key in ("good_moves", "blunders", "total_moves")
+    }
+
+    # Compara a última partida com as anteriores
+    progress = {
+        "improvement_from_last": compare(analysis[-2], analysis[-1]),
+        "improvement_from_average": compare(average, analysis[-1])
     }
+    if len(analysis) >= 3:
+        progress["improvement_from_two_games_ago"] = compare(analysis[-3], analysis[-1])
 
     return {
         "message": "Comparação realizada!",
+        "games": analysis,
         "progress": progress
     }
 
@@ -999,6 +1429,7 @@ async def play_autonomous_game(move_req: MoveRequest, game_id: str = Query(...))
     board.push(chess.Move.from_uci(move))
 
     if board.is_checkmate():
+        engine_pool.release(f"autonomous-{game_id}")
         return {
             "fen": board.fen(),
             "status": "fim",
@@ -1008,14 +1439,16 @@ async def play_autonomous_game(move_req: MoveRequest, game_id: str = Query(...))
             "winner": "player"
         }
 
-    stockfish.set_fen_position(board.fen())
-    best_move = stockfish.get_best_move()
+    best_move = opening_book.choose(board)
+    if best_move is None:
+        async with engine_pool.acquire(game_id=f"autonomous-{game_id}", play=True) as stockfish:
+            best_move = await stockfish.get_best_move_async(board)
 
     if best_move and chess.Move.from_uci(best_move) in board.legal_moves:
         board.push(chess.Move.from_uci(best_move))
-        stockfish.set_fen_position(board.fen())
 
         if board.is_checkmate():
+            engine_pool.release(f"autonomous-{game_id}")
             return {
                 "fen": board.fen(),
                 "status": "fim",
@@ -0,0 +1,140 @@
+import threading
+import time
+
+import chess
+
+
+class ActiveGame:
+    """Estado em memória de um jogo em andamento."""
+
+    def __init__(self, game_id: int, user_id: int, board: chess.Board, difficulty: str | None = None,
+                 evaluation: dict | None = None):
+        self.game_id = game_id
+        self.user_id = user_id
+        self.board = board  # Tabuleiro com o histórico de lances (o motor e o ponder dependem dele)
+        self.difficulty = difficulty
+        self.evaluation = evaluation  # Última avaliação gravada, no formato de /evaluate_position/
+        self.finished = False
+        self.last_used = time.monotonic()
+
+    @property
+    def ply(self) -> int:
+        return self.board.ply()
+
+
+class ActiveGameCache:
+    """Cache em memória dos jogos em andamento, para que uma jogada não precise ler o banco.
+
+    O banco continua sendo a fonte da verdade: quem altera um jogo grava
+    no banco e depois atualiza a entrada (write-through). A entrada é
+    removida quando o jogo termina (``finish``) ou depois de
+    ``idle_timeout`` segundos sem uso; a próxima requisição recarrega o
+    jogo do banco com ``load``.
+    """
+
+    def __init__(self, maxsize: int = 10000, idle_timeout: float = 1800):
+        if maxsize < 1:
+            raise ValueError("O cache precisa ter pelo menos uma entrada")
+
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+        self._lock = threading.Lock()
+        self._games: dict[int, ActiveGame] = {}
+        self._by_user: dict[int, int] = {}
+        self._next_expiry = 0.0
+
+    def _expire(self):
+        # A varredura dos jogos parados roda no máximo uma vez a cada décimo do idle_timeout
+        now = time.monotonic()
+        if now >= self._next_expiry:
+            self._next_expiry = now + self.idle_timeout / 10
+            for game_id in [g for g, game in self._games.items() if now - game.last_used > self.idle_timeout]:
+                self._remove(game_id)
+
+        # Cheio: descarta os jogos parados há mais tempo
+        overflow = len(self._games) - self.maxsize
+        if overflow > 0:
+            for game in sorted(self._games.values(), key=lambda g: g.last_used)[:overflow]:
+                self._remove(game.game_id)
+
+    def _remove(self, game_id: int) -> ActiveGame | None:
+        game = self._games.pop(game_id, None)
+        if game is not None and self._by_user.get(game.user_id) == game_id:
+            del self._by_user[game.user_id]
+        return game
+
+    def _found(self, game: ActiveGame | None) -> ActiveGame | None:
+        if game is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        game.last_used = time.monotonic()
+        return game
+
+    def get(self, game_id: int) -> ActiveGame | None:
+        with self._lock:
+            self._expire()
+            return self._found(self._games.get(game_id))
+
+    def for_user(self, user_id: int) -> ActiveGame | None:
+        """Jogo em andamento do usuário, se estiver em memória."""
+        with self._lock:
+            self._expire()
+            game_id = self._by_user.get(user_id)
+            return self._found(self._games.get(game_id) if game_id is not None else None)
+
+    def put(self, game: ActiveGame) -> ActiveGame:
+        with self._lock:
+            self._remove(game.game_id)
+            self._games[game.game_id] = game
+            self._by_user[game.user_id] = game.game_id
+            self._expire()
+            return game
+
+    def load(self, game, moves, evaluation: dict | None = None) -> ActiveGame:
+        """Monta a entrada a partir da linha do jogo e das suas jogadas (linhas com ``move`` e ``board_string``).
+
+        O tabuleiro é refeito a partir das jogadas para manter o histórico;
+        se elas não formam uma partida válida, parte do último FEN salvo.
+        """
+        board = chess.Board()
+        try:
+            for row in moves:
+                if row.move:
+                    board.push_uci(row.move)
+        except ValueError:
+            last_fen = next((row.board_string for row in reversed(moves) if row.board_string), None)
+            board = chess.Board(last_fen) if last_fen else chess.Board()
+
+        with self._lock:
+            self.loads += 1
+        return self.put(ActiveGame(game.id, game.user_id, board, game.difficulty, evaluation))
+
+    def finish(self, game_id: int):
+        """Remove o jogo encerrado; quem ainda tem a entrada em mãos vê ``finished``."""
+        with self._lock:
+            game = self._remove(game_id)
+            if game is not None:
+                game.finished = True
+
+    def discard(self, game_id: int):
+        """Remove a entrada sem encerrar o jogo (ex.: jogadas gravadas por fora); ela será recarregada do banco."""
+        with self._lock:
+            self._remove(game_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._games),
+                "maxsize": self.maxsize,
+                "idle_timeout": self.idle_timeout,
+                "loads": self.loads,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict
+
+import chess
+import chess.polyglot
+
+
+class LRUCache:
+    """Cache LRU thread-safe com contagem de acertos e erros.
+
+    Os valores são compartilhados entre as requisições e não devem ser
+    alterados.
+    """
+
+    def __init__(self, maxsize: int):
+        if maxsize < 1:
+            raise ValueError("O cache precisa ter pelo menos uma entrada")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)  # Remove a entrada usada há mais tempo
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class AnalysisCache(LRUCache):
+    """Cache LRU de análises de posição, compartilhado por todos os motores do pool.
+
+    A chave é ``(hash Zobrist da posição, profundidade, nível, limites de
+    tempo/nós)`` e o valor é o resultado da busca: ``{"best_move", "score",
+    "pv"}``.
+    """
+
+    def __init__(self, maxsize: int = 50000):
+        super().__init__(maxsize)
+
+    @staticmethod
+    def key(board: chess.Board, depth: int | None, skill_level: int | None, budget: tuple = ()) -> tuple:
+        return (chess.polyglot.zobrist_hash(board), depth, skill_level, budget)
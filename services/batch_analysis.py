@@ -0,0 +1,75 @@
+import asyncio
+import logging
+
+import chess
+
+from services.engine_pool import EnginePool
+
+logger = logging.getLogger(__name__)
+
+
+def batch_positions(fens=None, moves=None, start_fen: str | None = None) -> list[chess.Board]:
+    """Posições de um lote: os FENs dados e/ou as posições da partida ``moves`` (da inicial até a final).
+
+    Levanta ``ValueError`` indicando o primeiro FEN ou jogada inválida.
+    """
+    boards = []
+    for i, fen in enumerate(fens or []):
+        try:
+            boards.append(chess.Board(fen))
+        except ValueError:
+            raise ValueError(f"FEN inválido na posição {i}: {fen}")
+
+    if moves:
+        try:
+            board = chess.Board(start_fen) if start_fen else chess.Board()
+        except ValueError:
+            raise ValueError(f"FEN inicial inválido: {start_fen}")
+
+        boards.append(board.copy(stack=False))
+        for move in moves:
+            try:
+                board.push_uci(move)
+            except ValueError:
+                raise ValueError(f"Movimento inválido detectado: {move}")
+            boards.append(board.copy(stack=False))
+
+    return boards
+
+
+async def analyze_batch(pool: EnginePool, boards: list[chess.Board], skill_level: int | None = None,
+                        depth: int | None = None, **limits):
+    """Analisa ``boards`` com o pool e gera ``(índice, análise)`` na ordem em que ficam prontas.
+
+    O lote usa no máximo ``pool.size - 1`` motores, deixando um livre para
+    as partidas em andamento (com um só motor, o lote usa esse). Cada
+    worker empresta um motor por posição e volta ao fim da fila do pool,
+    então as jogadas das partidas continuam entrando entre as buscas. Uma
+    posição em que a análise falhou (ex.: motor indisponível) gera ``(índice, None)`` sem interromper
+    o restante. Se quem consome o gerador parar (cliente desconectado), as
+    buscas pendentes são canceladas.
+    """
+    pending: asyncio.Queue = asyncio.Queue()
+    for item in enumerate(boards):
+        pending.put_nowait(item)
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def work():
+        while not pending.empty():
+            index, board = pending.get_nowait()
+            try:
+                async with pool.acquire(skill_level, depth, **limits) as worker:
+                    analysis = await worker.get_analysis_async(board)
+            except Exception:
+                logger.exception("Erro ao analisar a posição %s do lote", index)
+                analysis = None
+            await results.put((index, analysis))
+
+    tasks = [asyncio.create_task(work()) for _ in range(min(max(pool.size - 1, 1), len(boards)))]
+    try:
+        for _ in boards:
+            yield await results.get()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
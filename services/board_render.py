@@ -0,0 +1,32 @@
+import chess
+
+# Moldura do tabuleiro no mesmo formato do comando "d" do Stockfish
+SEPARATOR = "+---+---+---+---+---+---+---+---+"
+FILES = "  " + "   ".join(chess.FILE_NAMES)
+
+
+def board_visual(board: chess.Board) -> str:
+    """Desenho ASCII do tabuleiro (brancas embaixo), idêntico ao do comando ``d`` do Stockfish, sem o motor."""
+    lines = []
+    for rank in range(7, -1, -1):
+        lines.append(SEPARATOR)
+        pieces = []
+        for file in range(8):
+            piece = board.piece_at(chess.square(file, rank))
+            pieces.append(piece.symbol() if piece else " ")
+        lines.append("| " + " | ".join(pieces) + f" | {rank + 1}")
+    lines.append(SEPARATOR)
+    lines.append(FILES)
+    return "\n".join(lines) + "\n"
+
+
+def board_matrix(board: chess.Board) -> list[list[str]]:
+    """Matriz 8x8 do tabuleiro, da 8ª à 1ª fileira, com ``"."`` nas casas vazias."""
+    matrix = []
+    for rank in range(7, -1, -1):
+        row = []
+        for file in range(8):
+            piece = board.piece_at(chess.square(file, rank))
+            row.append(piece.symbol() if piece else ".")
+        matrix.append(row)
+    return matrix
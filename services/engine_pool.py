@@ -0,0 +1,1015 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+
+import chess
+import chess.engine
+
+from services.analysis_cache import AnalysisCache
+from services.evaluation_store import EvaluationStore, wdl_to_tuple
+from services.tablebase import Tablebase
+
+logger = logging.getLogger(__name__)
+
+# Nível máximo do Stockfish: só nele a jogada escolhida é a melhor da variante principal
+MAX_SKILL_LEVEL = 20
+
+# Folga (s) além do ``max_time`` para o motor responder ao "stop" antes de ser considerado travado
+STOP_GRACE = 1.0
+# Prazo (s) para comandos que não são buscas (setoption)
+COMMAND_TIMEOUT = 5.0
+
+# Falhas que indicam motor travado ou encerrado: o processo é reiniciado
+ENGINE_FAILURES = (TimeoutError, chess.engine.EngineError, chess.engine.EngineTerminatedError)
+
+# Valor das peças para a jogada de emergência
+PIECE_VALUES = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3, chess.ROOK: 5, chess.QUEEN: 9, chess.KING: 0}
+
+
+class EngineUnavailableError(RuntimeError):
+    """O motor falhou (travou ou caiu) mesmo depois de reiniciado."""
+
+
+def score_to_dict(score: chess.engine.PovScore | None) -> dict:
+    """Converte a pontuação do motor para ``{"type": "cp"|"mate", "value": int}`` do ponto de vista das brancas."""
+    if score is None:
+        return {"type": "cp", "value": 0}
+
+    white = score.white()
+    if white.is_mate():
+        return {"type": "mate", "value": white.mate()}
+    return {"type": "cp", "value": white.score()}
+
+
+def shallow_move(board: chess.Board) -> str | None:
+    """Jogada de emergência sem motor: mate imediato, senão a captura/promoção mais valiosa."""
+
+    def gain(move: chess.Move) -> tuple:
+        board.push(move)
+        mate = board.is_checkmate()
+        board.pop()
+
+        captured = board.piece_type_at(move.to_square) or (chess.PAWN if board.is_en_passant(move) else None)
+        value = PIECE_VALUES[captured] if captured else 0
+        if move.promotion:
+            value += PIECE_VALUES[move.promotion] - PIECE_VALUES[chess.PAWN]
+        return (mate, value, board.gives_check(move), move.uci())
+
+    moves = list(board.legal_moves)
+    return max(moves, key=gain).uci() if moves else None
+
+
+class EngineWorker:
+    """Um processo Stockfish controlado pelo protocolo UCI assíncrono do python-chess.
+
+    Cada operação existe em duas versões: a síncrona, para as rotas ``def``
+    (que rodam no threadpool), e a ``*_async``, que pode ser aguardada no
+    event loop sem bloqueá-lo durante a busca. As buscas consultam a
+    ``tablebase`` de finais, o ``cache`` em memória e depois o ``store``
+    persistente antes de falar com o motor, que só é chamado quando não há
+    análise guardada com a profundidade pedida.
+    """
+
+    def __init__(self, path: str, cache: AnalysisCache | None = None, store: EvaluationStore | None = None, multipv: int = 3,
+                 tablebase: Tablebase | None = None, syzygy_path: str | None = None, call_timeout: float = 30):
+        self.path = path
+        self.syzygy_path = syzygy_path
+        self.engine = self._spawn()
+        self.cache = cache
+        self.store = store
+        self.multipv = multipv
+        self.tablebase = tablebase
+        self.call_timeout = call_timeout
+        self.respawns = 0
+        self.fallbacks = 0
+        # Opções UCI já enviadas a este processo: só as que mudam são reenviadas
+        self.options: dict = {}
+        self.reconfigurations = 0
+        self.skill_level: int | None = None
+        self.depth: int | None = None
+        self.movetime: float | None = None
+        self.nodes: int | None = None
+        self.max_time: float | None = None
+        self.game = None
+        self.timeouts = 0
+
+        # Ponder: posição esperada (após a jogada da IA e a resposta prevista) em busca durante a vez do jogador
+        self.ponder = False
+        self.pondering: chess.Board | None = None
+        self.ponder_analysis: dict | None = None  # Análise da busca que iniciou o ponder
+        self.ponder_started = 0.0
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        self.ponder_time_saved = 0.0
+
+        # Trabalho especulativo (baixa prioridade) e se ele foi interrompido porque uma requisição real precisa do motor
+        self.speculative = False
+        self.preempted = False
+
+    @property
+    def limit(self) -> chess.engine.Limit:
+        # O motor para no primeiro limite atingido: profundidade, tempo ou nós
+        return chess.engine.Limit(depth=self.depth, time=self.movetime, nodes=self.nodes)
+
+    @property
+    def budget(self) -> tuple:
+        """Limites que, além da profundidade e do nível, mudam o resultado de uma busca."""
+        return (self.movetime, self.nodes, self.max_time)
+
+    def deadline(self, searches: int = 1) -> float:
+        """Prazo máximo de uma chamada com ``searches`` buscas seguidas: passado dele, o motor é dado como travado.
+
+        Cada busca pode ir até ``max_time``; a folga para o "stop" vale uma vez.
+        """
+        if self.max_time is None:
+            return self.call_timeout
+        return min(self.call_timeout, searches * self.max_time + STOP_GRACE)
+
+    def _spawn(self) -> chess.engine.SimpleEngine:
+        engine = chess.engine.SimpleEngine.popen_uci(self.path)
+        if self.syzygy_path:
+            # O motor também usa as tablebases durante a busca, nas posições que o Python não responde
+            engine.configure({"SyzygyPath": self.syzygy_path})
+        return engine
+
+    def _respawn(self):
+        """Mata o processo travado (ou que caiu) e sobe outro com a mesma configuração."""
+        self.engine.close()
+        self.engine = self._spawn()
+        if self.options:
+            self.engine.configure(self.options)
+        self.pondering = None
+        self.respawns += 1
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.engine.protocol.loop)
+
+    def _run(self, make_coro, timeout: float | None = None):
+        """Roda um comando no loop do motor com prazo.
+
+        ``make_coro`` cria a corrotina do comando. Se o motor travar ou cair,
+        o processo é reiniciado e o comando é repetido uma vez no motor novo;
+        se falhar de novo, levanta ``EngineUnavailableError``.
+        """
+        for attempt in range(2):
+            future = self._submit(make_coro())
+            try:
+                return future.result(timeout=timeout or self.deadline())
+            except ENGINE_FAILURES as e:
+                future.cancel()
+                self._respawn()
+                if attempt:
+                    raise EngineUnavailableError("O motor Stockfish não respondeu") from e
+
+    async def _run_async(self, make_coro, timeout: float | None = None):
+        for attempt in range(2):
+            future = self._submit(make_coro())
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.deadline())
+            except ENGINE_FAILURES as e:
+                future.cancel()
+                await asyncio.to_thread(self._respawn)
+                if attempt:
+                    raise EngineUnavailableError("O motor Stockfish não respondeu") from e
+
+    def option_changes(self, skill_level: int, options: dict | None = None) -> dict:
+        """Opções UCI (nível e as do perfil) que ainda não estão aplicadas neste motor."""
+        wanted = {"Skill Level": skill_level, **(options or {})}
+        return {name: value for name, value in wanted.items() if self.options.get(name) != value}
+
+    async def _send_options(self, changes: dict):
+        self._settle_ponder()
+        await self.engine.protocol.configure(changes)
+        self.options.update(changes)
+        self.skill_level = self.options["Skill Level"]
+        self.reconfigurations += 1
+
+    def _set_limits(self, depth: int, movetime: float | None = None, nodes: int | None = None,
+                    max_time: float | None = None, game=None, ponder: bool = False):
+        # Limites da busca ficam só no Python: mudá-los não custa nenhum comando ao motor
+        self.depth = depth
+        self.movetime = movetime
+        self.nodes = nodes
+        self.max_time = max_time
+        # Identifica a partida para o python-chess: ao trocar de jogo ele envia "ucinewgame" e limpa a tabela de transposição
+        self.game = game
+        self.ponder = ponder
+        self.preempted = False
+
+    def _settle_ponder(self, board: chess.Board | None = None) -> bool:
+        """Encerra a contabilidade do ponder antes de um novo comando ao motor.
+
+        Devolve ``True`` se ``board`` é exatamente a posição prevista: o
+        python-chess então envia ``ponderhit`` e a busca já em andamento
+        vira a resposta. Qualquer outro comando interrompe o ponder (o
+        python-chess envia ``stop``) e conta como erro de previsão.
+        """
+        if self.pondering is None:
+            return False
+
+        hit = board is not None and board == self.pondering and board.move_stack == self.pondering.move_stack
+        if hit:
+            self.ponder_hits += 1
+            self.ponder_time_saved += time.monotonic() - self.ponder_started
+        else:
+            self.ponder_misses += 1
+        self.pondering = None
+        return hit
+
+    async def _preempt(self):
+        # O motor pode já ter voltado ao pool e estar atendendo uma requisição real: essa não é interrompida
+        if self.speculative:
+            self.preempted = True
+            self.engine.protocol.send_line("stop")
+
+    async def _candidate_moves(self, board: chess.Board, count: int) -> list[str]:
+        # Busca MultiPV: as ``count`` melhores jogadas da posição, da melhor para a pior
+        self._settle_ponder()
+        lines = await self._bounded(self.engine.protocol.analyse(
+            board, self.limit, multipv=count, game=self.game, info=chess.engine.INFO_PV
+        ))
+        return [line["pv"][0].uci() for line in lines if line.get("pv")]
+
+    async def _stop_ponder(self):
+        if self.pondering is not None:
+            self._settle_ponder()
+            self.engine.protocol.send_line("stop")
+
+    async def _bounded(self, coro):
+        """Aguarda a busca respeitando o teto de tempo real ``max_time``.
+
+        Passado o teto, o motor recebe ``stop`` e responde com a melhor
+        jogada encontrada até ali, então a requisição sempre tem resposta.
+        """
+        if self.max_time is None:
+            return await coro
+
+        search = asyncio.ensure_future(coro)
+        try:
+            return await asyncio.wait_for(asyncio.shield(search), self.max_time)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.engine.protocol.send_line("stop")
+            return await search
+
+    async def _analysis(self, board: chess.Board, ponder: bool = False) -> dict:
+        # Uma única busca devolve a jogada escolhida (já com o nível aplicado), a avaliação e a variante principal
+        self._settle_ponder(board)
+        result = await self._bounded(self.engine.protocol.play(
+            board, self.limit, game=self.game, ponder=ponder, info=chess.engine.INFO_SCORE | chess.engine.INFO_PV
+        ))
+
+        score = result.info.get("score")
+        analysis = {
+            "best_move": result.move.uci() if result.move else None,
+            "score": score_to_dict(score),
+            "pv": [move.uci() for move in result.info.get("pv", [])],
+            "depth": result.info.get("depth", self.depth),
+            "wdl": wdl_to_tuple(result.info.get("wdl"), score),
+        }
+
+        if ponder and result.move and result.ponder:
+            # O motor segue buscando a resposta prevista do jogador ("go ponder") até o próximo comando
+            self.pondering = board.copy()
+            self.pondering.push(result.move)
+            self.pondering.push(result.ponder)
+            self.ponder_analysis = analysis
+            self.ponder_started = time.monotonic()
+
+        return analysis
+
+    async def _move_analysis(self, board: chess.Board, move: chess.Move) -> dict:
+        # Uma busca MultiPV traz a avaliação da posição, a da melhor jogada e, quase sempre, a da jogada do usuário
+        self._settle_ponder()
+        lines = await self._bounded(self.engine.protocol.analyse(
+            board, self.limit, multipv=self.multipv, game=self.game, info=chess.engine.INFO_SCORE | chess.engine.INFO_PV
+        ))
+        best = lines[0]
+        score = best.get("score")
+        pv = best.get("pv", [])
+
+        move_score = next((line.get("score") for line in lines if line.get("pv", [None])[0] == move), None)
+        if move_score is None:
+            # A jogada ficou fora das melhores linhas: busca restrita a ela (searchmoves)
+            info = await self._bounded(
+                self.engine.protocol.analyse(board, self.limit, root_moves=[move], game=self.game, info=chess.engine.INFO_SCORE)
+            )
+            move_score = info.get("score")
+
+        return {
+            "best_move": pv[0].uci() if pv else None,
+            "score": score_to_dict(score),
+            "move_score": score_to_dict(move_score),
+            "pv": [m.uci() for m in pv],
+            "depth": best.get("depth", self.depth),
+            "wdl": wdl_to_tuple(best.get("wdl"), score),
+        }
+
+    async def _evaluation_stream(self, board: chess.Board, depth: int, publish) -> dict | None:
+        # Uma única busca de aprofundamento iterativo: cada linha "info depth ... score ..." é repassada assim que chega
+        last = None
+        self._settle_ponder()
+        with await self.engine.protocol.analysis(
+            board, chess.engine.Limit(depth=depth), game=self.game, info=chess.engine.INFO_SCORE | chess.engine.INFO_PV
+        ) as search:
+            async for info in search:
+                if info.get("multipv", 1) != 1 or "score" not in info or "depth" not in info:
+                    continue
+                score = info["score"]
+                last = {
+                    "best_move": info["pv"][0].uci() if info.get("pv") else None,
+                    "score": score_to_dict(score),
+                    "pv": [move.uci() for move in info.get("pv", [])],
+                    "depth": info["depth"],
+                    "wdl": wdl_to_tuple(info.get("wdl"), score),
+                }
+                publish(last)
+        return last
+
+    def _pondered_move_analysis(self, board: chess.Board, move: chess.Move) -> dict | None:
+        """Se ``move`` é a resposta prevista pelo ponder, a análise sai da busca que o iniciou, sem comando ao motor.
+
+        A jogada prevista é a melhor da variante principal, com a mesma
+        avaliação. Qualquer busca aqui interromperia o ponder, e a jogada
+        seguinte da IA perderia o ``ponderhit``.
+        """
+        pondering, analysis = self.pondering, self.ponder_analysis
+        if pondering is None or analysis is None:
+            return None
+
+        expected = board.copy()
+        expected.push(move)
+        if expected != pondering or expected.move_stack != pondering.move_stack:
+            return None
+        return {**analysis, "best_move": move.uci(), "move_score": analysis["score"], "pv": analysis["pv"][1:]}
+
+    def _stored_move_analysis(self, board: chess.Board, move: chess.Move) -> dict | None:
+        """Se a jogada é exatamente a melhor já guardada, a análise sai do banco sem busca."""
+        if self.store is None:
+            return None
+
+        analysis = self.store.get(board, min_depth=self.depth or 0)
+        if analysis is None or analysis["best_move"] != move.uci():
+            return None
+        return {**analysis, "move_score": analysis["score"]}
+
+    def _cache_key(self, board: chess.Board) -> tuple | None:
+        if self.cache is None:
+            return None
+        return self.cache.key(board, self.depth, self.skill_level, self.budget)
+
+    def _cached(self, board: chess.Board) -> dict | None:
+        key = self._cache_key(board)
+        return self.cache.get(key) if key else None
+
+    @property
+    def full_strength(self) -> bool:
+        return self.skill_level is not None and self.skill_level >= MAX_SKILL_LEVEL
+
+    def _stored(self, board: chess.Board, need_move: bool) -> dict | None:
+        """Busca uma análise persistida com pelo menos a profundidade pedida.
+
+        A jogada guardada é a melhor da variante principal, então ela só
+        substitui a busca quando o motor joga no nível máximo; abaixo disso
+        o armazenamento só responde avaliações (``need_move=False``).
+        """
+        if self.store is None or (need_move and not self.full_strength):
+            return None
+
+        analysis = self.store.get(board, min_depth=self.depth or 0)
+        if analysis is not None and self.full_strength and self.cache is not None:
+            self.cache.put(self._cache_key(board), analysis)
+        return analysis
+
+    def _probed(self, board: chess.Board, need_move: bool) -> dict | None:
+        """Análise exata da tablebase; como no ``store``, a jogada só é usada no nível máximo."""
+        if self.tablebase is None or (need_move and not self.full_strength):
+            return None
+        return self.tablebase.probe(board)
+
+    def _probed_move(self, board: chess.Board, move: chess.Move) -> dict | None:
+        if self.tablebase is None:
+            return None
+        return self.tablebase.probe_move(board, move)
+
+    def _remember(self, board: chess.Board, analysis: dict):
+        if self.cache is not None:
+            self.cache.put(self._cache_key(board), analysis)
+        if self.store is not None:
+            self.store.put(board, analysis)
+
+    def configure(self, skill_level: int, depth: int, options: dict | None = None, **limits):
+        """Prepara o motor para o próximo uso; só as opções UCI diferentes das atuais são enviadas."""
+        changes = self.option_changes(skill_level, options)
+        if changes:
+            self._run(lambda: self._send_options(changes), COMMAND_TIMEOUT)
+        self._set_limits(depth, **limits)
+
+    def get_analysis(self, board: chess.Board, need_move: bool = True, ponder: bool = False) -> dict:
+        analysis = self._probed(board, need_move) or self._cached(board) or self._stored(board, need_move)
+        if analysis is None:
+            analysis = self._run(lambda: self._analysis(board.copy(), ponder))
+            self._remember(board, analysis)
+        return analysis
+
+    def get_analyses(self, boards, need_move: bool = True) -> list[dict]:
+        """Análise de várias posições: uma consulta em lote ao banco e uma busca por posição que faltar."""
+        analyses = [self._probed(board, need_move) or self._cached(board) for board in boards]
+        missing = [i for i, analysis in enumerate(analyses) if analysis is None]
+
+        if missing and self.store is not None and (self.full_strength or not need_move):
+            stored = self.store.get_many([boards[i] for i in missing], min_depth=self.depth or 0)
+            for i in missing:
+                analyses[i] = stored.get(self.store.normalize(boards[i]))
+                if analyses[i] is not None and self.full_strength and self.cache is not None:
+                    self.cache.put(self._cache_key(boards[i]), analyses[i])
+
+        searched = []
+        for i, board in enumerate(boards):
+            if analyses[i] is None:
+                analyses[i] = self._run(lambda: self._analysis(board.copy()))
+                if self.cache is not None:
+                    self.cache.put(self._cache_key(board), analyses[i])
+                searched.append((board, analyses[i]))
+
+        if searched and self.store is not None:
+            self.store.put_many(searched)
+
+        return analyses
+
+    def _fallback_move(self, board: chess.Board) -> str | None:
+        """Jogada para quando o motor falhou: a melhor já conhecida (tablebase, cache ou banco, em
+        qualquer profundidade), senão a jogada de emergência de ``shallow_move``."""
+        self.fallbacks += 1
+        known = self.tablebase.probe(board) if self.tablebase is not None else None
+        if known is None and self.cache is not None:
+            known = self.cache.get(self._cache_key(board))
+        if known is None and self.store is not None:
+            known = self.store.get(board)
+        if known is not None and known["best_move"]:
+            return known["best_move"]
+        return shallow_move(board)
+
+    def get_best_move(self, board: chess.Board) -> str | None:
+        try:
+            return self.get_analysis(board, ponder=self.ponder)["best_move"]
+        except EngineUnavailableError:
+            return self._fallback_move(board)
+
+    def get_move_analysis(self, board: chess.Board, move: chess.Move) -> dict:
+        """Avalia a posição, a melhor jogada e a jogada ``move`` numa única busca."""
+        analysis = (
+            self._probed_move(board, move)
+            or self._pondered_move_analysis(board, move)
+            or self._stored_move_analysis(board, move)
+        )
+        if analysis is None:
+            # Até duas buscas: a MultiPV e, se a jogada ficou de fora dela, a restrita à jogada
+            analysis = self._run(lambda: self._move_analysis(board.copy(), move), self.deadline(searches=2))
+            if self.store is not None:
+                self.store.put(board, analysis)
+        return analysis
+
+    def close(self):
+        self.engine.quit()
+
+    def preempt(self):
+        """Interrompe a busca especulativa em andamento; o motor responde na hora e volta ao pool."""
+        self._submit(self._preempt())
+
+    def stop_ponder(self):
+        """Interrompe o ponder sem esperar a resposta do motor (ex.: a partida acabou)."""
+        self._submit(self._stop_ponder())
+
+    def warm_up(self, boards):
+        """Buscas fixas que carregam a rede neural do motor; os resultados vão para o cache e o banco."""
+        for board in boards:
+            self._remember(board, self._run(lambda: self._analysis(board.copy())))
+
+    async def configure_async(self, skill_level: int, depth: int, options: dict | None = None, **limits):
+        changes = self.option_changes(skill_level, options)
+        if changes:
+            await self._run_async(lambda: self._send_options(changes), COMMAND_TIMEOUT)
+        self._set_limits(depth, **limits)
+
+    async def get_analysis_async(self, board: chess.Board, need_move: bool = True, ponder: bool = False) -> dict:
+        # Tablebase e cache em memória são consultados direto; o banco fica numa thread para não bloquear o event loop
+        analysis = (
+            self._probed(board, need_move)
+            or self._cached(board)
+            or await asyncio.to_thread(self._stored, board, need_move)
+        )
+        if analysis is None:
+            analysis = await self._run_async(lambda: self._analysis(board.copy(), ponder))
+            await asyncio.to_thread(self._remember, board, analysis)
+        return analysis
+
+    async def get_best_move_async(self, board: chess.Board) -> str | None:
+        try:
+            return (await self.get_analysis_async(board, ponder=self.ponder))["best_move"]
+        except EngineUnavailableError:
+            return await asyncio.to_thread(self._fallback_move, board)
+
+    async def get_move_analysis_async(self, board: chess.Board, move: chess.Move) -> dict:
+        analysis = (
+            self._probed_move(board, move)
+            or self._pondered_move_analysis(board, move)
+            or await asyncio.to_thread(self._stored_move_analysis, board, move)
+        )
+        if analysis is None:
+            analysis = await self._run_async(lambda: self._move_analysis(board.copy(), move), self.deadline(searches=2))
+            if self.store is not None:
+                await asyncio.to_thread(self.store.put, board, analysis)
+        return analysis
+
+    async def get_candidate_moves_async(self, board: chess.Board, count: int) -> list[str]:
+        return await self._run_async(lambda: self._candidate_moves(board.copy(), count))
+
+    async def get_speculative_analysis_async(self, board: chess.Board) -> dict | None:
+        """Como ``get_analysis_async``, mas descarta (``None``) a busca interrompida por ``preempt()``."""
+        analysis = self._cached(board) or await asyncio.to_thread(self._stored, board, True)
+        if analysis is not None:
+            return analysis
+
+        analysis = await self._run_async(lambda: self._analysis(board.copy()))
+        if self.preempted:
+            return None  # Busca cortada no meio: rasa demais para ser guardada
+        await asyncio.to_thread(self._remember, board, analysis)
+        return analysis
+
+    async def stream_evaluation_async(self, board: chess.Board, depth: int):
+        """Gera a análise parcial de cada profundidade, de 1 até ``depth``, durante uma única busca.
+
+        Se a tablebase resolve a posição, ou se o banco já a tem com essa
+        profundidade, gera só essa análise, sem consultar o motor. A análise
+        final é persistida.
+        """
+        probed = self._probed(board, need_move=False)
+        if probed is not None:
+            yield probed
+            return
+
+        if self.store is not None:
+            stored = await asyncio.to_thread(self.store.get, board, depth)
+            if stored is not None:
+                yield stored
+                return
+
+        # As linhas chegam na thread do motor e são entregues ao event loop da requisição por esta fila
+        loop = asyncio.get_running_loop()
+        updates: "asyncio.Queue[dict | None]" = asyncio.Queue()
+
+        search = asyncio.wrap_future(self._submit(self._evaluation_stream(
+            board.copy(), depth, lambda analysis: loop.call_soon_threadsafe(updates.put_nowait, analysis)
+        )))
+        search.add_done_callback(lambda _: loop.call_soon(updates.put_nowait, None))
+
+        deadline = loop.time() + self.call_timeout
+        while True:
+            try:
+                analysis = await asyncio.wait_for(updates.get(), max(deadline - loop.time(), 0))
+            except TimeoutError:
+                search.cancel()
+                await asyncio.to_thread(self._respawn)
+                raise EngineUnavailableError("O motor Stockfish não respondeu")
+            if analysis is None:
+                break
+            yield analysis
+
+        try:
+            final = await search
+        except ENGINE_FAILURES as e:
+            await asyncio.to_thread(self._respawn)
+            raise EngineUnavailableError("O motor Stockfish caiu durante a avaliação") from e
+        if final is not None and self.store is not None:
+            await asyncio.to_thread(self.store.put, board, final)
+
+
+class EnginePool:
+    """Pool de processos Stockfish.
+
+    Cada requisição pega um motor emprestado com ``checkout()`` (ou
+    ``acquire()`` nas rotas assíncronas), define sua própria posição, nível
+    e limites de busca, e o devolve ao final. Assim várias buscas rodam em
+    paralelo (uma por processo) sem sobrescrever a posição umas das outras.
+    Com todos os motores ocupados, os pedidos são atendidos por ordem de
+    chegada: quem devolve um motor e pede outro em seguida (ex.: um lote)
+    entra no fim da fila.
+
+    Um jogo em andamento fica vinculado ao motor que usou por último: as
+    próximas jogadas voltam a ele (se estiver livre) e aproveitam a tabela
+    de transposição já preenchida. O vínculo é desfeito com ``release()``
+    ou depois de ``affinity_timeout`` segundos sem uso.
+
+    Além da profundidade, cada busca pode ser limitada por tempo
+    (``movetime``, em segundos) e por nós (``nodes``); ``max_time`` é o
+    teto de tempo real imposto pelo próprio pool caso o motor passe dele.
+
+    Toda chamada ao motor tem prazo (``call_timeout``, ou ``max_time`` por
+    busca da chamada mais uma folga): um motor que passa dele ou cai é
+    morto e reiniciado, e a chamada é repetida uma vez no processo novo.
+    Se falhar de novo, a jogada da IA sai da melhor análise já conhecida
+    ou de ``shallow_move``; as demais chamadas levantam
+    ``EngineUnavailableError``.
+
+    Cada jogo pode usar um perfil nomeado (``add_profile()``: nível, opções
+    UCI e limites de busca) em vez dos padrões do pool, sem afetar os
+    demais jogos. Cada motor lembra as opções que já recebeu e só reenvia
+    as diferentes; na falta do motor do jogo, o pool prefere um que já está
+    com as opções do perfil.
+
+    Com ``ponder``, o motor que acabou de jogar segue buscando a resposta
+    prevista do jogador; só o checkout da próxima jogada do mesmo jogo
+    (``play=True``) aproveita essa busca, e as demais requisições evitam
+    esse motor enquanto houver outro livre. A análise da jogada prevista
+    não usa o motor, então não interrompe o ponder.
+
+    Os processos só sobem em ``start()`` e só recebem requisições depois
+    do aquecimento em ``warm_up()``; até lá ``ready`` é falso e quem pede
+    um motor espera no máximo ``ready_timeout`` segundos antes de receber
+    ``EngineUnavailableError``. Um motor que falha no aquecimento entra
+    frio no pool, sem impedir que ele fique pronto.
+    """
+
+    def __init__(self, path: str, size: int = 1, skill_level: int = 10, depth: int = 15,
+                 cache: AnalysisCache | None = None, store: EvaluationStore | None = None, multipv: int = 3,
+                 tablebase: Tablebase | None = None, syzygy_path: str | None = None, affinity_timeout: float = 600,
+                 ponder: bool = False, call_timeout: float = 30, ready_timeout: float = 60):
+        if size < 1:
+            raise ValueError("O pool precisa de pelo menos um motor")
+
+        self.path = path
+        self.size = size
+        self.skill_level = skill_level
+        self.depth = depth
+        self.movetime: float | None = None
+        self.nodes: int | None = None
+        self.max_time: float | None = None
+        self.cache = cache
+        self.store = store
+
+        self.multipv = multipv
+        self.tablebase = tablebase
+        self.syzygy_path = syzygy_path
+        self.affinity_timeout = affinity_timeout
+        self.ponder = ponder
+        self.call_timeout = call_timeout
+        self.ready_timeout = ready_timeout
+        self.profiles: dict[str, dict] = {}
+        self.affinity_hits = 0
+        self.affinity_misses = 0
+        self.ready = False
+
+        self._lock = threading.Lock()
+        self._workers: list[EngineWorker] = []
+        # Motores livres e vínculos jogo -> motor (com o instante do último uso), protegidos por _idle_changed
+        self._idle_changed = threading.Condition()
+        self._idle: list[EngineWorker] = []
+        self._bindings: dict = {}
+        self._last_used: dict = {}
+        self._speculative: set[EngineWorker] = set()
+        # Quem espera um motor, por ordem de chegada: cada item acorda seu dono quando um motor fica livre
+        self._waiters: deque = deque()
+        self.preemptions = 0
+
+    def _spawn(self) -> EngineWorker:
+        return EngineWorker(
+            self.path, cache=self.cache, store=self.store, multipv=self.multipv,
+            tablebase=self.tablebase, syzygy_path=self.syzygy_path, call_timeout=self.call_timeout
+        )
+
+    def start(self):
+        """Abre os processos Stockfish em paralelo; eles só ficam disponíveis depois de ``warm_up()``."""
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            self._workers = list(executor.map(lambda _: self._spawn(), range(self.size)))
+
+    def warm_up(self, boards=()):
+        """Aquece cada motor com buscas nas posições ``boards`` e libera o pool para as requisições."""
+        settings = self._settings(None, None)
+
+        def prepare(worker: EngineWorker):
+            try:
+                worker.configure(**settings)
+                worker.warm_up(boards)
+            except Exception:
+                # O watchdog já reiniciou o processo: o motor entra no pool sem aquecer
+                logger.exception("Erro ao aquecer o motor Stockfish")
+
+        try:
+            if boards:
+                with ThreadPoolExecutor(max_workers=self.size) as executor:
+                    list(executor.map(prepare, self._workers))
+        finally:
+            with self._idle_changed:
+                self._idle = list(self._workers)
+                self.ready = True
+                self._wake_next()
+
+    def add_profile(self, name: str, skill_level: int, depth: int, movetime: float | None = None,
+                    nodes: int | None = None, max_time: float | None = None, options: dict | None = None):
+        """Registra um perfil de busca (ex.: um nível de dificuldade) que os empréstimos podem pedir pelo nome.
+
+        ``options`` são opções UCI extras do perfil (ex.: ``{"UCI_LimitStrength": True}``).
+        """
+        with self._lock:
+            self.profiles[name] = {
+                "skill_level": skill_level,
+                "depth": depth,
+                "movetime": movetime,
+                "nodes": nodes,
+                "max_time": max_time,
+                "options": dict(options or {}),
+            }
+
+    def settings(self, profile: str | None = None) -> dict:
+        """Nível, opções e limites de busca do perfil ``profile`` (ou os padrões do pool)."""
+        return self._settings(None, None, profile)
+
+    def _settings(self, skill_level: int | None, depth: int | None, profile: str | None = None, **limits) -> dict:
+        # ``limits`` sobrepõe movetime, nodes e max_time do pool só nesta busca (``None`` mantém o padrão)
+        with self._lock:
+            if profile is not None:
+                if profile not in self.profiles:
+                    raise ValueError(f"Perfil de motor desconhecido: {profile}")
+                settings = {**self.profiles[profile], "options": dict(self.profiles[profile]["options"])}
+            else:
+                settings = {
+                    "skill_level": self.skill_level,
+                    "depth": self.depth,
+                    "movetime": self.movetime,
+                    "nodes": self.nodes,
+                    "max_time": self.max_time,
+                    "options": {},
+                }
+        if skill_level is not None:
+            settings["skill_level"] = skill_level
+        if depth is not None:
+            settings["depth"] = depth
+        settings.update({name: value for name, value in limits.items() if value is not None})
+        return settings
+
+    def _expire_bindings(self):
+        now = time.monotonic()
+        for game_id in [g for g, last in self._last_used.items() if now - last > self.affinity_timeout]:
+            self._unbind(game_id)
+
+    def _unbind(self, game_id):
+        self._bindings.pop(game_id, None)
+        self._last_used.pop(game_id, None)
+
+    def _take(self, game_id, play: bool = False, settings: dict | None = None) -> EngineWorker | None:
+        """Tira um motor da lista de livres, preferindo o vinculado ao jogo; ``None`` se todos estão ocupados.
+
+        Entre os demais, prefere um que já tem as opções UCI de ``settings``, evitando reconfigurá-lo.
+        """
+        self._expire_bindings()
+        if not self._idle:
+            return None
+
+        bound = self._bindings.get(game_id) if game_id is not None else None
+        if bound is not None and bound in self._idle and (play or bound.pondering is None):
+            worker = bound
+            self.affinity_hits += 1
+        else:
+            # Prefere um motor que não está em ponder e sem jogo; senão, o do jogo parado há mais tempo perde o vínculo
+            owners = {w: g for g, w in self._bindings.items()}
+            worker = min(self._idle, key=lambda w: (
+                w.pondering is not None,
+                w in owners,
+                settings is not None and bool(w.option_changes(settings["skill_level"], settings["options"])),
+                self._last_used[owners[w]] if w in owners else 0,
+            ))
+            if game_id is not None:
+                self.affinity_misses += 1
+
+            # Sem vínculo (ou com o motor do jogo ocupado, que continua sendo o dele) só vincula jogo novo
+            if game_id is not None and bound is None:
+                if worker in owners:
+                    self._unbind(owners[worker])
+                self._bindings[game_id] = worker
+
+        if game_id is not None and game_id in self._bindings:
+            self._last_used[game_id] = time.monotonic()
+
+        self._idle.remove(worker)
+        return worker
+
+    def _preempt_speculation(self):
+        """Uma requisição real está esperando: interrompe o trabalho especulativo para liberar motores."""
+        for worker in self._speculative:
+            self.preemptions += 1
+            worker.preempt()
+        self._speculative.clear()
+
+    def _wake_next(self):
+        # Só o primeiro da fila pode pegar o motor livre: quem devolve e pede de novo entra atrás dele
+        if self._waiters and self._idle:
+            self._waiters[0]()
+
+    def _leave(self, ticket):
+        """Tira ``ticket`` da fila de espera (atendido, expirado ou cancelado) e passa a vez ao próximo."""
+        if ticket in self._waiters:
+            self._waiters.remove(ticket)
+        self._wake_next()
+
+    def _give_back(self, worker: EngineWorker):
+        with self._idle_changed:
+            self._idle.append(worker)
+            self._wake_next()
+
+    @contextmanager
+    def checkout(self, skill_level: int | None = None, depth: int | None = None, timeout: float | None = None,
+                 game_id=None, play: bool = False, profile: str | None = None):
+        """Empresta um motor livre, aguardando até ``timeout`` segundos.
+
+        Com ``game_id``, o jogo usa sempre o mesmo motor enquanto ele
+        estiver livre, reaproveitando a tabela de transposição das jogadas
+        anteriores. ``play=True`` indica que o motor vai escolher a jogada
+        da IA, e só então o ponder (se ativo) é usado. ``profile`` escolhe
+        um perfil registrado em vez dos padrões do pool.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # Antes do aquecimento terminar, a espera tem prazo mesmo sem ``timeout``
+        warming = None if self.ready else time.monotonic() + self.ready_timeout
+        settings = self._settings(skill_level, depth, profile)
+
+        with self._idle_changed:
+            worker = None if self._waiters else self._take(game_id, play, settings)
+            if worker is None:
+                ticket = self._idle_changed.notify_all
+                self._waiters.append(ticket)
+                try:
+                    while True:
+                        if self._waiters[0] is ticket:
+                            worker = self._take(game_id, play, settings)
+                            if worker is not None:
+                                break
+                        now = time.monotonic()
+                        remaining = None if deadline is None else deadline - now
+                        if remaining is not None and remaining <= 0:
+                            raise TimeoutError("Nenhum motor Stockfish disponível no pool")
+                        if warming is not None and not self.ready:
+                            if now >= warming:
+                                raise EngineUnavailableError("Os motores Stockfish ainda não estão prontos")
+                            remaining = min(remaining, warming - now) if remaining is not None else warming - now
+                        self._preempt_speculation()
+                        self._idle_changed.wait(timeout=remaining)
+                finally:
+                    self._leave(ticket)
+
+        try:
+            worker.configure(**settings, game=game_id, ponder=self.ponder and play)
+            yield worker
+        finally:
+            self._give_back(worker)
+
+    @asynccontextmanager
+    async def acquire(self, skill_level: int | None = None, depth: int | None = None, timeout: float | None = None,
+                      game_id=None, play: bool = False, profile: str | None = None, **limits):
+        """Versão assíncrona de ``checkout()``: a espera por um motor livre não bloqueia o event loop.
+
+        ``limits`` (``movetime``, ``nodes``, ``max_time``) substitui os limites do pool só neste empréstimo.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        # Antes do aquecimento terminar, a espera tem prazo mesmo sem ``timeout``
+        warming = None if self.ready else loop.time() + self.ready_timeout
+        settings = self._settings(skill_level, depth, profile, **limits)
+
+        with self._idle_changed:
+            worker = None if self._waiters else self._take(game_id, play, settings)
+            if worker is None:
+                # Motor devolvido em outra thread: o aviso chega ao event loop desta requisição
+                wakeup = asyncio.Event()
+                ticket = lambda: loop.call_soon_threadsafe(wakeup.set)
+                self._waiters.append(ticket)
+                self._preempt_speculation()
+
+        if worker is None:
+            try:
+                while True:
+                    with self._idle_changed:
+                        if self._waiters[0] is ticket:
+                            worker = self._take(game_id, play, settings)
+                            if worker is not None:
+                                break
+                        self._preempt_speculation()
+                    now = loop.time()
+                    remaining = None if deadline is None else deadline - now
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("Nenhum motor Stockfish disponível no pool")
+                    if warming is not None and not self.ready:
+                        if now >= warming:
+                            raise EngineUnavailableError("Os motores Stockfish ainda não estão prontos")
+                        remaining = min(remaining, warming - now) if remaining is not None else warming - now
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), remaining)
+                    except TimeoutError:
+                        pass
+                    wakeup.clear()
+            finally:
+                with self._idle_changed:
+                    self._leave(ticket)
+
+        try:
+            await worker.configure_async(**settings, game=game_id, ponder=self.ponder and play)
+            yield worker
+        finally:
+            self._give_back(worker)
+
+    @asynccontextmanager
+    async def spare(self, game_id=None, profile: str | None = None):
+        """Empresta um motor ocioso para trabalho especulativo, ou ``None`` se não houver.
+
+        O motor não espera: se todos estão ocupados (ou pensando na vez do
+        jogador), entrega ``None``. Enquanto emprestado, qualquer requisição
+        real que ache o pool vazio interrompe a busca (``worker.preempted``).
+        """
+        settings = self._settings(None, None, profile)
+
+        with self._idle_changed:
+            worker = None
+            # Com requisições reais na fila, o motor livre é delas
+            if not self._waiters and any(w.pondering is None for w in self._idle):
+                worker = self._take(game_id, settings=settings)
+                worker.speculative = True
+                self._speculative.add(worker)
+
+        if worker is None:
+            yield None
+            return
+
+        try:
+            await worker.configure_async(**settings, game=game_id)
+            yield worker
+        finally:
+            with self._idle_changed:
+                worker.speculative = False
+                self._speculative.discard(worker)
+            self._give_back(worker)
+
+    def release(self, game_id):
+        """Desfaz o vínculo do jogo com seu motor (ex.: ao fim da partida) e interrompe o ponder dele."""
+        with self._idle_changed:
+            worker = self._bindings.get(game_id)
+            self._unbind(game_id)
+            if worker is not None and worker in self._idle and worker.pondering is not None:
+                worker.stop_ponder()
+
+    def close(self):
+        """Encerra os processos Stockfish do pool."""
+        self.ready = False
+        with self._idle_changed:
+            self._idle = []
+        for worker in self._workers:
+            worker.close()
+
+    @property
+    def available(self) -> int:
+        return len(self._idle)
+
+    def affinity_stats(self) -> dict:
+        with self._idle_changed:
+            self._expire_bindings()
+            lookups = self.affinity_hits + self.affinity_misses
+            return {
+                "bound_games": len(self._bindings),
+                "timeout": self.affinity_timeout,
+                "hits": self.affinity_hits,
+                "misses": self.affinity_misses,
+                "hit_rate": round(self.affinity_hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def ponder_stats(self) -> dict:
+        hits = sum(worker.ponder_hits for worker in self._workers)
+        misses = sum(worker.ponder_misses for worker in self._workers)
+        return {
+            "enabled": self.ponder,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "time_saved_s": round(sum(worker.ponder_time_saved for worker in self._workers), 2),
+        }
+
+    def profile_stats(self) -> dict:
+        return {
+            "profiles": sorted(self.profiles),
+            # Vezes em que algum motor precisou receber setoption (mudança de nível ou de opções)
+            "reconfigurations": sum(worker.reconfigurations for worker in self._workers),
+        }
+
+    def watchdog_stats(self) -> dict:
+        return {
+            "call_timeout": self.call_timeout,
+            "respawns": sum(worker.respawns for worker in self._workers),
+            "fallbacks": sum(worker.fallbacks for worker in self._workers),
+        }
+
+    @property
+    def timeouts(self) -> int:
+        """Buscas interrompidas pelo teto ``max_time``."""
+        return sum(worker.timeouts for worker in self._workers)
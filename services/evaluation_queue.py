@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class EvaluationQueue:
+    """Fila limitada de avaliações em segundo plano, com no máximo um job pendente por jogo.
+
+    O job de um jogo sempre avalia a posição mais recente dele, então um
+    novo pedido para um jogo que já está na fila apenas substitui o
+    anterior. Quando a fila está cheia, o pedido pendente mais antigo é
+    descartado para dar lugar ao novo. Os ``workers`` rodam no event loop
+    e chamam ``handler(game_id)``, que deve abrir a própria sessão do banco.
+    """
+
+    def __init__(self, handler, maxsize: int = 100, workers: int = 1):
+        if maxsize < 1:
+            raise ValueError("A fila precisa ter pelo menos uma posição")
+        if workers < 1:
+            raise ValueError("A fila precisa de pelo menos um worker")
+
+        self.handler = handler
+        self.maxsize = maxsize
+        self.workers = workers
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+
+        # game_id -> instante (monotônico) do pedido pendente
+        self._pending: "OrderedDict[int, float]" = OrderedDict()
+        self._running: set[int] = set()
+        self._loop = None
+        self._ready = None
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        """Inicia os workers no event loop atual (reinicia se o loop mudou)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+
+        self._loop = loop
+        self._ready = asyncio.Event()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        if self._pending:
+            self._ready.set()
+
+    async def stop(self):
+        """Cancela os workers; pedidos pendentes são descartados."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._pending.clear()
+
+    def submit(self, game_id: int):
+        """Agenda a avaliação da posição atual do jogo, substituindo um pedido pendente do mesmo jogo."""
+        self.start()
+        self.submitted += 1
+
+        if game_id in self._pending:
+            # Mantém o instante do pedido mais antigo: o atraso medido é o que o jogador percebe
+            self._pending.move_to_end(game_id)
+            self.coalesced += 1
+        else:
+            if len(self._pending) >= self.maxsize:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+            self._pending[game_id] = time.monotonic()
+
+        self._ready.set()
+
+    def _next(self) -> tuple[int, float] | None:
+        # Um jogo já em avaliação espera o job atual terminar antes de ser avaliado de novo
+        for game_id in self._pending:
+            if game_id not in self._running:
+                return game_id, self._pending.pop(game_id)
+        return None
+
+    async def _worker(self):
+        while True:
+            await self._ready.wait()
+
+            job = self._next()
+            if job is None:
+                self._ready.clear()
+                continue
+
+            game_id, enqueued_at = job
+            lag = time.monotonic() - enqueued_at
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._total_lag += lag
+
+            self._running.add(game_id)
+            try:
+                await self.handler(game_id)
+                self.completed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Erro ao avaliar o jogo %s", game_id)
+            finally:
+                self._running.discard(game_id)
+                if self._pending:
+                    self._ready.set()
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        started = self.completed + self.failed + len(self._running)
+        return {
+            "depth": self.depth,
+            "maxsize": self.maxsize,
+            "workers": self.workers,
+            "running": len(self._running),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "completed": self.completed,
+            "failed": self.failed,
+            "last_lag_ms": round(self.last_lag * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "avg_lag_ms": round(self._total_lag / started * 1000, 1) if started else 0.0,
+        }
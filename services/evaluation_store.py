@@ -0,0 +1,136 @@
+import threading
+from datetime import datetime
+
+import chess
+import chess.engine
+from sqlalchemy.dialects.sqlite import insert
+
+from database.database import SessionLocal
+from Model.positionEvaluation import PositionEvaluation
+
+# Limite de variáveis por consulta do SQLite: FENs por SELECT e linhas (10 colunas) por INSERT
+CHUNK_SIZE = 500
+ROWS_PER_INSERT = 50
+
+
+def wdl_to_tuple(wdl: chess.engine.PovWdl | None, score: chess.engine.PovScore | None) -> tuple | None:
+    """Probabilidades (por mil) de vitória/empate/derrota das brancas.
+
+    Usa o WDL informado pelo motor e, na falta dele, a estimativa do modelo
+    do Stockfish a partir da pontuação.
+    """
+    if wdl is None:
+        if score is None:
+            return None
+        wdl = score.wdl()
+
+    white = wdl.white()
+    return (white.wins, white.draws, white.losses)
+
+
+class EvaluationStore:
+    """Avaliações de posições gravadas no banco, para sobreviverem a reinícios e deploys.
+
+    Cada posição (FEN normalizado) guarda apenas a análise mais profunda já
+    feita: uma gravação mais rasa que a existente é ignorada.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(board: chess.Board) -> str:
+        return board.epd()
+
+    @staticmethod
+    def _to_analysis(row: PositionEvaluation) -> dict:
+        wdl = None
+        if row.wdl_win is not None:
+            wdl = (row.wdl_win, row.wdl_draw, row.wdl_loss)
+
+        return {
+            "best_move": row.best_move,
+            "score": {"type": row.score_type, "value": row.score},
+            "pv": [row.best_move] if row.best_move else [],
+            "depth": row.depth,
+            "wdl": wdl,
+        }
+
+    def get_many(self, boards, min_depth: int = 0) -> dict:
+        """Busca em lote; devolve ``{fen normalizado: análise}`` apenas das posições com profundidade suficiente."""
+        fens = list(dict.fromkeys(self.normalize(board) for board in boards))
+        found = {}
+
+        db = self.session_factory()
+        try:
+            for i in range(0, len(fens), CHUNK_SIZE):
+                rows = (
+                    db.query(PositionEvaluation)
+                    .filter(PositionEvaluation.fen.in_(fens[i:i + CHUNK_SIZE]), PositionEvaluation.depth >= min_depth)
+                    .all()
+                )
+                for row in rows:
+                    found[row.fen] = self._to_analysis(row)
+        finally:
+            db.close()
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(fens) - len(found)
+
+        return found
+
+    def get(self, board: chess.Board, min_depth: int = 0) -> dict | None:
+        return self.get_many([board], min_depth).get(self.normalize(board))
+
+    def put_many(self, items):
+        """Grava em lote pares ``(board, análise)``, mantendo sempre a análise mais profunda."""
+        rows = []
+        for board, analysis in items:
+            wdl = analysis.get("wdl") or (None, None, None)
+            rows.append({
+                "fen": self.normalize(board),
+                "score_type": analysis["score"]["type"],
+                "score": analysis["score"]["value"],
+                "depth": analysis["depth"],
+                "best_move": analysis["pv"][0] if analysis["pv"] else None,
+                "wdl_win": wdl[0],
+                "wdl_draw": wdl[1],
+                "wdl_loss": wdl[2],
+                "last_updated": datetime.utcnow(),
+            })
+
+        if not rows:
+            return
+
+        db = self.session_factory()
+        try:
+            for i in range(0, len(rows), ROWS_PER_INSERT):
+                stmt = insert(PositionEvaluation).values(rows[i:i + ROWS_PER_INSERT])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["fen"],
+                    set_={
+                        column: stmt.excluded[column]
+                        for column in ("score_type", "score", "depth", "best_move", "wdl_win", "wdl_draw", "wdl_loss", "last_updated")
+                    },
+                    where=stmt.excluded.depth > PositionEvaluation.depth,
+                )
+                db.execute(stmt)
+            db.commit()
+        finally:
+            db.close()
+
+    def put(self, board: chess.Board, analysis: dict):
+        self.put_many([(board, analysis)])
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
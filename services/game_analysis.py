@@ -0,0 +1,79 @@
+import chess
+
+
+def classify_move(diff_to_best: int) -> str:
+    """Classifica a jogada pela diferença (em centipawns) entre ela e a melhor jogada."""
+    if diff_to_best == 0:
+        return "Brilhante 💎"
+    elif -30 <= diff_to_best < 0:
+        return "Boa ✅"
+    elif -100 <= diff_to_best < -30:
+        return "Ok 🤷"
+    return "Gafe ❌"
+
+
+def game_positions(moves) -> list[chess.Board]:
+    """Posições da partida, da inicial até a final (uma a mais que o número de jogadas).
+
+    As posições são copiadas sem o histórico de lances, para que o motor
+    receba só o FEN de cada uma em vez de repetir a partida inteira.
+    """
+    board = chess.Board()
+    positions = [board.copy(stack=False)]
+
+    for move in moves:
+        if not move:
+            continue  # Jogada vazia que marca o início da partida
+        try:
+            board.push_uci(move)
+        except ValueError:
+            raise ValueError(f"Movimento inválido detectado: {move}")
+        positions.append(board.copy(stack=False))
+
+    return positions
+
+
+def analyze_game(worker, moves) -> list[dict]:
+    """Analisa a partida inteira percorrendo-a uma única vez.
+
+    Cada posição é buscada uma só vez: a avaliação da posição ``i + 1`` é a
+    avaliação "depois" da jogada ``i``. Devolve um item por jogada com a
+    jogada feita, a melhor jogada e as avaliações (ponto de vista das
+    brancas) antes e depois dela.
+    """
+    positions = game_positions(moves)
+    analyses = worker.get_analyses(positions)
+    played = [move for move in moves if move]
+
+    return [
+        {
+            "ply": i + 1,
+            "move": move,
+            "is_white": positions[i].turn == chess.WHITE,
+            "best_move": analyses[i]["best_move"],
+            "score_before": analyses[i]["score"],
+            "score_after": analyses[i + 1]["score"],
+        }
+        for i, move in enumerate(played)
+    ]
+
+
+def summarize_game(plies) -> dict:
+    """Conta boas jogadas, erros graves e total de jogadas a partir de ``analyze_game``."""
+    good_moves, blunders = 0, 0
+
+    for ply in plies:
+        eval_diff = ply["score_before"]["value"] - ply["score_after"]["value"]
+
+        if ply["best_move"] == ply["move"]:
+            good_moves += 1  # Jogada perfeita
+        elif eval_diff > 200:
+            blunders += 1  # Erro grave
+        elif eval_diff > 100:
+            blunders += 0.5  # Pequeno erro
+
+    return {
+        "good_moves": good_moves,
+        "blunders": blunders,
+        "total_moves": len(plies)
+    }
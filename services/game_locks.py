@@ -0,0 +1,28 @@
+import asyncio
+import weakref
+
+
+class GameLocks:
+    """Um ``asyncio.Lock`` por jogo: jogadas do mesmo jogo são processadas uma de cada vez.
+
+    Jogos diferentes não disputam o mesmo lock. Os locks ficam num
+    dicionário de referências fracas e somem sozinhos quando nenhuma
+    requisição do jogo os está usando.
+    """
+
+    def __init__(self):
+        self._locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def lock(self, game_id: int) -> asyncio.Lock:
+        lock = self._locks.get(game_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[game_id] = lock
+        return lock
+
+    def stats(self) -> dict:
+        locks = list(self._locks.values())
+        return {
+            "games": len(locks),
+            "locked": sum(lock.locked() for lock in locks),
+        }
@@ -0,0 +1,45 @@
+import chess
+
+from services.analysis_cache import LRUCache
+
+
+def replay_positions(moves) -> list[dict]:
+    """Percorre a partida uma única vez e devolve a posição de cada meio-lance, a começar pela inicial.
+
+    ``moves`` são as linhas da tabela ``moves`` em ordem (com ``move``,
+    ``mv_quality`` e ``is_player``); a jogada vazia que marca o início da
+    partida é ignorada. Levanta ``ValueError`` numa jogada inválida.
+    """
+    board = chess.Board()
+    positions = [{"ply": 0, "move": None, "san": None, "fen": board.fen(), "mv_quality": None, "is_player": None}]
+
+    for row in moves:
+        if not row.move:
+            continue  # Jogada vazia que marca o início da partida
+        try:
+            move = board.parse_uci(row.move)
+        except ValueError:
+            raise ValueError(f"Movimento inválido detectado: {row.move}")
+
+        san = board.san(move)
+        board.push(move)
+        positions.append({
+            "ply": len(positions),
+            "move": row.move,
+            "san": san,
+            "fen": board.fen(),
+            "mv_quality": row.mv_quality,
+            "is_player": row.is_player,
+        })
+
+    return positions
+
+
+class ReplayCache(LRUCache):
+    """Cache LRU das posições de partidas encerradas, que não mudam mais.
+
+    A chave é o id do jogo e o valor é a lista de ``replay_positions``.
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        super().__init__(maxsize)
@@ -0,0 +1,110 @@
+import random
+import threading
+
+import chess
+import chess.polyglot
+
+
+class OpeningBook:
+    """Livro de aberturas em memória, indexado pelo hash Zobrist (o mesmo do formato Polyglot).
+
+    Pode ser carregado de um arquivo Polyglot ``.bin`` e/ou montado a partir
+    das partidas salvas. Cada posição guarda as respostas conhecidas com um
+    peso; ``choose`` sorteia uma delas proporcionalmente ao peso (ou pega a
+    de maior peso com ``weighted=False``) enquanto a partida não passou de
+    ``max_ply`` meios-lances. A consulta é um acesso a dicionário, sem motor.
+    """
+
+    def __init__(self, max_ply: int = 12, weighted: bool = True, seed: int | None = None):
+        self.max_ply = max_ply
+        self.weighted = weighted
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        # hash Zobrist -> {jogada UCI: peso}
+        self._entries: dict[int, dict[str, int]] = {}
+
+    def add(self, board: chess.Board, move: str, weight: int = 1):
+        replies = self._entries.setdefault(chess.polyglot.zobrist_hash(board), {})
+        replies[move] = replies.get(move, 0) + weight
+
+    def load_polyglot(self, path: str) -> int:
+        """Carrega todas as entradas de um livro Polyglot; devolve quantas foram lidas."""
+        count = 0
+        with chess.polyglot.open_reader(path) as reader:
+            for entry in reader:
+                if entry.weight <= 0:
+                    continue
+                replies = self._entries.setdefault(entry.key, {})
+                move = entry.move.uci()  # Roque no formato Polyglot (rei captura torre), ex.: e1h1
+                replies[move] = replies.get(move, 0) + entry.weight
+                count += 1
+        return count
+
+    def add_games(self, games) -> int:
+        """Soma ao livro as jogadas (até ``max_ply``) de partidas dadas como listas de jogadas UCI."""
+        count = 0
+        for moves in games:
+            board = chess.Board()
+            for move in moves:
+                if not move:
+                    continue  # Jogada vazia que marca o início da partida
+                if board.ply() >= self.max_ply:
+                    break
+                try:
+                    parsed = chess.Move.from_uci(move)
+                except ValueError:
+                    break
+                if parsed not in board.legal_moves:
+                    break
+                self.add(board, move)
+                board.push(parsed)
+                count += 1
+        return count
+
+    def _legal_replies(self, board: chess.Board) -> dict[str, int]:
+        replies = None
+        if board.ply() < self.max_ply:
+            replies = self._entries.get(chess.polyglot.zobrist_hash(board))
+
+        # Descarta colisões de hash e jogadas ilegais; parse_uci também converte o roque do Polyglot
+        legal = {}
+        for move, weight in (replies or {}).items():
+            try:
+                move = board.parse_uci(move).uci()
+            except ValueError:
+                continue
+            legal[move] = legal.get(move, 0) + weight
+        return legal
+
+    def moves(self, board: chess.Board) -> list[str]:
+        """Jogadas do livro para a posição, da mais para a menos frequente (sem contar nas estatísticas)."""
+        legal = self._legal_replies(board)
+        return sorted(legal, key=legal.get, reverse=True)
+
+    def choose(self, board: chess.Board) -> str | None:
+        """Jogada do livro para a posição, ou ``None`` se ela não estiver no livro."""
+        legal = self._legal_replies(board)
+
+        with self._lock:
+            if not legal:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+            if not self.weighted:
+                return max(legal, key=legal.get)
+            return self._random.choices(list(legal), weights=list(legal.values()))[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "positions": len(self._entries),
+                "max_ply": self.max_ply,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,134 @@
+import io
+from datetime import datetime
+from itertools import groupby
+
+import chess
+import chess.pgn
+from sqlalchemy import insert
+
+from Model.games import Game
+from Model.moves import Move
+from Model.users import User
+
+# Resultado PGN de cada status (o jogador humano joga de brancas contra o Stockfish)
+STATUS_RESULTS = {
+    "player_win": "1-0",
+    "ai_win": "0-1",
+    "draw": "1/2-1/2",
+}
+RESULT_STATUSES = {result: status for status, result in STATUS_RESULTS.items()}
+
+
+def game_pgn(game, moves) -> str:
+    """PGN de uma partida a partir da linha do jogo (id, status, datas, usuário) e das jogadas UCI."""
+    pgn = chess.pgn.Game()
+    pgn.headers["Event"] = "Pychess"
+    pgn.headers["Site"] = "Pychess"
+    if game.begin_time:
+        pgn.headers["Date"] = game.begin_time.strftime("%Y.%m.%d")
+    pgn.headers["White"] = game.username or f"Usuário {game.user_id}"
+    pgn.headers["Black"] = "Stockfish"
+    pgn.headers["Result"] = STATUS_RESULTS.get(game.status, "*")
+    pgn.headers["GameId"] = str(game.id)
+
+    node, board = pgn, chess.Board()
+    for move in moves:
+        try:
+            parsed = board.parse_uci(move)
+        except ValueError:
+            pgn.headers["Annotator"] = f"Partida truncada: jogada inválida {move}"
+            break
+        node = node.add_variation(parsed)
+        board.push(parsed)
+
+    return str(pgn) + "\n\n"
+
+
+def export_games(session_factory, user_id: int | None = None, status: str | None = None,
+                 date_from: datetime | None = None, date_to: datetime | None = None, batch_size: int = 1000):
+    """Gera o PGN das partidas filtradas, uma por vez.
+
+    Jogos e jogadas vêm de uma única consulta ordenada por jogo, lida do
+    cursor em blocos de ``batch_size`` linhas: só as jogadas da partida
+    atual ficam em memória, qualquer que seja o número de partidas.
+    """
+    with session_factory() as db:
+        query = (
+            db.query(Game.id, Game.user_id, Game.status, Game.begin_time, User.username, Move.move)
+            .outerjoin(User, User.id == Game.user_id)
+            .outerjoin(Move, Move.game_id == Game.id)
+        )
+        if user_id is not None:
+            query = query.filter(Game.user_id == user_id)
+        if status is not None:
+            query = query.filter(Game.status == status)
+        if date_from is not None:
+            query = query.filter(Game.begin_time >= date_from)
+        if date_to is not None:
+            query = query.filter(Game.begin_time <= date_to)
+
+        rows = query.order_by(Game.id, Move.id).execution_options(stream_results=True, yield_per=batch_size)
+        for _, game_rows in groupby(rows, key=lambda row: row.id):
+            game_rows = list(game_rows)
+            yield game_pgn(game_rows[0], [row.move for row in game_rows if row.move])
+
+
+def _begin_time(headers) -> datetime | None:
+    try:
+        return datetime.strptime(headers.get("Date", ""), "%Y.%m.%d")
+    except ValueError:
+        return None  # Data ausente ou parcial (ex.: "????.??.??")
+
+
+def _game_moves(pgn) -> list[dict] | None:
+    """Linhas da tabela ``moves`` da partida (a primeira, vazia, marca o início), ou ``None`` se não der para importar."""
+    if pgn.errors or "FEN" in pgn.headers or pgn.headers.get("Variant", "Standard") != "Standard":
+        return None  # Partidas com erro ou que não começam da posição inicial padrão
+
+    board = chess.Board()
+    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    rows = [{"is_player": None, "move": "", "board_string": board.fen(), "created_at": created_at}]
+    for move in pgn.mainline_moves():
+        is_player = board.turn == chess.WHITE
+        board.push(move)
+        rows.append({"is_player": is_player, "move": move.uci(), "board_string": board.fen(), "created_at": created_at})
+    return rows
+
+
+def import_games(db, pgn_file, user_id: int, batch_size: int = 500) -> dict:
+    """Importa as partidas de um arquivo PGN (binário) para o usuário, gravando em lotes de ``batch_size`` partidas.
+
+    O arquivo é lido partida a partida, sem carregá-lo inteiro. Só entram
+    partidas encerradas (resultado 1-0, 0-1 ou 1/2-1/2) que começam da
+    posição inicial; as demais são contadas em ``skipped``.
+    """
+    text = io.TextIOWrapper(pgn_file, encoding="utf-8-sig", errors="replace")
+    imported = skipped = 0
+    batch = []
+
+    def flush():
+        games = [Game(user_id=user_id, status=status, begin_time=begin_time) for status, begin_time, _ in batch]
+        db.add_all(games)
+        db.flush()  # Gera os ids dos jogos para as jogadas
+
+        rows = [{**row, "game_id": game.id} for game, (_, _, moves) in zip(games, batch) for row in moves]
+        db.execute(insert(Move), rows)
+        db.commit()
+        batch.clear()
+
+    while (pgn := chess.pgn.read_game(text)) is not None:
+        status = RESULT_STATUSES.get(pgn.headers.get("Result"))
+        moves = _game_moves(pgn) if status else None
+        if moves is None:
+            skipped += 1
+            continue
+
+        batch.append((status, _begin_time(pgn.headers), moves))
+        imported += 1
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    return {"imported": imported, "skipped": skipped}
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+from collections import OrderedDict
+
+import chess
+import chess.polyglot
+
+from services.engine_pool import EnginePool
+from services.opening_book import OpeningBook
+
+
+class SpeculativeScheduler:
+    """Pré-calcula, com motores ociosos, a resposta da IA às jogadas mais prováveis do jogador.
+
+    Depois de cada jogada da IA, ``schedule`` pega as ``top_k`` jogadas
+    candidatas do jogador (primeiro as do livro de aberturas, depois as
+    melhores linhas MultiPV do motor) e busca a resposta da IA para cada
+    uma. As respostas ficam num cache por jogo, que ``play_game`` consulta
+    com ``lookup`` antes do motor. O trabalho é de baixa prioridade: só usa
+    motores livres e é interrompido assim que uma requisição real precisa
+    de um deles.
+    """
+
+    def __init__(self, pool: EnginePool, book: OpeningBook | None = None, top_k: int = 3, max_games: int = 1000):
+        self.pool = pool
+        self.book = book
+        self.top_k = top_k
+        self.max_games = max_games
+
+        self.jobs = 0
+        self.precomputed = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        # game_id -> {(hash Zobrist, configuração do pool): jogada da IA}
+        self._replies: "OrderedDict[object, dict]" = OrderedDict()
+        self._tasks: dict = {}
+
+    def _settings_key(self, profile: str | None = None) -> tuple:
+        # Uma mudança de dificuldade invalida as respostas pré-calculadas com a configuração anterior
+        settings = self.pool.settings(profile)
+        options = settings.pop("options")
+        return tuple(settings.values()) + tuple(sorted(options.items()))
+
+    def schedule(self, game_id, board: chess.Board, profile: str | None = None):
+        """Agenda a especulação para a posição ``board`` (vez do jogador), substituindo a anterior do jogo.
+
+        ``profile`` é o perfil de motor (dificuldade) do jogo, o mesmo passado a ``lookup``.
+        """
+        if self.top_k < 1 or board.is_game_over():
+            return
+
+        self.discard(game_id)
+        with self._lock:
+            self._replies[game_id] = {}
+            self._replies.move_to_end(game_id)
+            if len(self._replies) > self.max_games:
+                self._replies.popitem(last=False)
+
+        task = asyncio.get_running_loop().create_task(self._speculate(game_id, board.copy(), profile))
+        self._tasks[game_id] = task
+        task.add_done_callback(lambda done: self._forget(game_id, done))
+
+    def _forget(self, game_id, task: asyncio.Task):
+        if self._tasks.get(game_id) is task:
+            del self._tasks[game_id]
+
+    def lookup(self, game_id, board: chess.Board, profile: str | None = None) -> str | None:
+        """Resposta pré-calculada da IA para a posição atual do jogo, se houver."""
+        if self.top_k < 1:
+            return None
+
+        with self._lock:
+            replies = self._replies.get(game_id)
+            move = None
+            if replies is not None:
+                move = replies.get((chess.polyglot.zobrist_hash(board), self._settings_key(profile)))
+
+            if move is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return move
+
+    def discard(self, game_id):
+        """Cancela a especulação do jogo e descarta as respostas guardadas (ex.: ao fim da partida)."""
+        task = self._tasks.pop(game_id, None)
+        if task is not None:
+            task.cancel()
+        with self._lock:
+            self._replies.pop(game_id, None)
+
+    async def _candidates(self, worker, board: chess.Board) -> list[str]:
+        candidates = self.book.moves(board) if self.book is not None else []
+        if len(candidates) < self.top_k:
+            for move in await worker.get_candidate_moves_async(board, self.top_k):
+                if move not in candidates:
+                    candidates.append(move)
+        return candidates[:self.top_k]
+
+    async def _speculate(self, game_id, board: chess.Board, profile: str | None = None):
+        async with self.pool.spare(game_id, profile) as worker:
+            if worker is None:
+                return  # Nenhum motor sobrando agora
+
+            self.jobs += 1
+            settings = self._settings_key(profile)
+
+            for move in await self._candidates(worker, board):
+                if worker.preempted:
+                    break
+
+                reply_board = board.copy()
+                reply_board.push_uci(move)
+                if reply_board.is_game_over():
+                    continue
+
+                analysis = await worker.get_speculative_analysis_async(reply_board)
+                if analysis is None or worker.preempted:
+                    break
+
+                with self._lock:
+                    replies = self._replies.get(game_id)
+                    if replies is None:
+                        break  # Jogo descartado enquanto a busca rodava
+                    replies[(chess.polyglot.zobrist_hash(reply_board), settings)] = analysis["best_move"]
+                    self.precomputed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "top_k": self.top_k,
+                "jobs": self.jobs,
+                "precomputed": self.precomputed,
+                "preemptions": self.pool.preemptions,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
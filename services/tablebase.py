@@ -0,0 +1,145 @@
+import os
+import threading
+
+import chess
+import chess.syzygy
+
+# Pontuação (centipawns) de uma vitória de tablebase, como a que o Stockfish informa
+TABLEBASE_WIN_SCORE = 20000
+# Profundidade atribuída ao resultado da tablebase: ele é exato, então vale mais que qualquer busca
+TABLEBASE_DEPTH = 100
+
+
+class Tablebase:
+    """Consulta às tablebases Syzygy de finais, feita em Python com ``chess.syzygy``.
+
+    Em posições com poucas peças (até ``max_pieces``, por padrão o maior
+    final presente nos arquivos) a melhor jogada e a avaliação saem direto
+    das tabelas, exatas e sem busca. ``path`` aceita vários diretórios
+    separados por ``os.pathsep``, como o ``SyzygyPath`` do Stockfish.
+    """
+
+    def __init__(self, path: str, max_pieces: int | None = None):
+        self.path = path
+        self.tables = chess.syzygy.Tablebase()
+        for directory in path.split(os.pathsep):
+            if directory:
+                self.tables.add_directory(directory)
+
+        available = max((len(name.replace("v", "")) for name in self.tables.wdl), default=0)
+        self.max_pieces = available if max_pieces is None else min(max_pieces, available)
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def covers(self, board: chess.Board) -> bool:
+        return (
+            not board.castling_rights
+            and chess.popcount(board.occupied) <= self.max_pieces
+            and not board.is_game_over()
+        )
+
+    def _wdl(self, board: chess.Board) -> int:
+        """WDL do lado que joga: 2 vitória, 1 vitória anulada pela regra dos 50 lances, 0 empate, -1, -2."""
+        if board.is_checkmate():
+            return -2
+        if board.is_game_over():
+            return 0
+        return self.tables.probe_wdl(board)
+
+    def _move_key(self, board: chess.Board, move: chess.Move) -> tuple:
+        """Chave de ordenação das jogadas: maior é melhor para quem joga."""
+        zeroing = board.is_zeroing(move)
+        board.push(move)
+        try:
+            mate = board.is_checkmate()
+            wdl = -self._wdl(board)
+            dtz = 0 if board.is_game_over() else self.tables.probe_dtz(board)
+        finally:
+            board.pop()
+
+        if wdl > 0:
+            # Ganhando: mate imediato, depois zerar o contador e chegar mais rápido à conversão
+            return (wdl, mate, zeroing, dtz)
+        if wdl < 0:
+            # Perdendo: adia a derrota o máximo possível
+            return (wdl, False, not zeroing, dtz)
+        return (wdl, False, False, 0)
+
+    @staticmethod
+    def _score(wdl: int) -> dict:
+        # Vitórias anuladas pela regra dos 50 lances (±1) contam como empate
+        if wdl == 2:
+            return {"type": "cp", "value": TABLEBASE_WIN_SCORE}
+        if wdl == -2:
+            return {"type": "cp", "value": -TABLEBASE_WIN_SCORE}
+        return {"type": "cp", "value": 0}
+
+    @staticmethod
+    def _wdl_tuple(wdl: int) -> tuple:
+        if wdl == 2:
+            return (1000, 0, 0)
+        if wdl == -2:
+            return (0, 0, 1000)
+        return (0, 1000, 0)
+
+    def probe(self, board: chess.Board) -> dict | None:
+        """Análise exata da posição (do ponto de vista das brancas), ou ``None`` se ela não está nas tabelas."""
+        if not self.covers(board):
+            return None
+
+        board = board.copy(stack=False)
+        try:
+            wdl = self._wdl(board)
+            best = max(board.legal_moves, key=lambda move: self._move_key(board, move))
+        except KeyError:
+            self._count(False)
+            return None
+
+        self._count(True)
+        if board.turn == chess.BLACK:
+            wdl = -wdl
+
+        return {
+            "best_move": best.uci(),
+            "score": self._score(wdl),
+            "pv": [best.uci()],
+            "depth": TABLEBASE_DEPTH,
+            "wdl": self._wdl_tuple(wdl),
+        }
+
+    def probe_move(self, board: chess.Board, move: chess.Move) -> dict | None:
+        """Como ``probe``, acrescentando ``move_score``: a avaliação depois da jogada ``move``."""
+        analysis = self.probe(board)
+        if analysis is None:
+            return None
+
+        after = board.copy(stack=False)
+        after.push(move)
+        try:
+            wdl = self._wdl(after)
+        except KeyError:
+            return None
+
+        if after.turn == chess.BLACK:
+            wdl = -wdl
+        return {**analysis, "move_score": self._score(wdl)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "max_pieces": self.max_pieces,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope="module")
+def session_factory(tmp_path_factory):
+    """Fábrica de sessões num banco SQLite vazio, criado só pelas migrations."""
+    url = f"sqlite:///{tmp_path_factory.mktemp('db') / 'xadrez.db'}"
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "head")
+
+    engine = create_engine(url)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def db(session_factory):
+    with session_factory() as session:
+        yield session
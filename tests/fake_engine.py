@@ -0,0 +1,64 @@
+"""Motor UCI falso para os testes: responde cada ``go`` depois de ``sys.argv[1]`` segundos (ou no ``stop``).
+
+A jogada é a primeira legal da posição, então o python-chess a aceita sem
+precisar do Stockfish. Um ``go ponder`` só responde no ``ponderhit`` ou
+no ``stop``.
+"""
+import sys
+import threading
+
+import chess
+
+DELAY = float(sys.argv[1]) if len(sys.argv) > 1 else 0.0
+
+board = chess.Board()
+search = None
+lock = threading.Lock()
+
+
+def first_move(position: chess.Board) -> chess.Move | None:
+    return next(iter(position.legal_moves), None)
+
+
+def reply(done: threading.Event, position: chess.Board, ponder: bool):
+    done.wait(None if ponder else DELAY)
+    move = first_move(position)
+    with lock:
+        if move is None:
+            print("bestmove (none)", flush=True)
+            return
+
+        position.push(move)
+        expected = first_move(position)
+        pv = f"{move.uci()} {expected.uci()}" if expected else move.uci()
+        print(f"info depth 1 multipv 1 score cp 0 pv {pv}")
+        print(f"bestmove {move.uci()}" + (f" ponder {expected.uci()}" if expected else ""), flush=True)
+
+
+for line in sys.stdin:
+    command = line.split()
+    if not command:
+        continue
+    if command[0] == "uci":
+        print("id name Fake")
+        print("option name Skill Level type spin default 20 min 0 max 20")
+        print("option name MultiPV type spin default 1 min 1 max 500")
+        print("option name Ponder type check default false")
+        print("uciok", flush=True)
+    elif command[0] == "isready":
+        with lock:
+            print("readyok", flush=True)
+    elif command[0] == "position":
+        if command[1] == "startpos":
+            board, rest = chess.Board(), command[2:]
+        else:
+            board, rest = chess.Board(" ".join(command[2:8])), command[8:]
+        for move in rest[1:] if rest[:1] == ["moves"] else []:
+            board.push_uci(move)
+    elif command[0] == "go":
+        search = threading.Event()
+        threading.Thread(target=reply, args=(search, board.copy(), "ponder" in command), daemon=True).start()
+    elif command[0] in ("stop", "ponderhit") and search is not None:
+        search.set()
+    elif command[0] == "quit":
+        break
@@ -0,0 +1,58 @@
+"""Um lote de análises não pode tomar o pool das partidas em andamento."""
+import asyncio
+import sys
+from pathlib import Path
+
+import chess
+import pytest
+
+from services.batch_analysis import analyze_batch
+from services.engine_pool import EnginePool
+
+FAKE_ENGINE = str(Path(__file__).resolve().parent / "fake_engine.py")
+SEARCH_TIME = 0.05
+
+
+def positions(count: int) -> list[chess.Board]:
+    boards = []
+    board = chess.Board()
+    while len(boards) < count:
+        board.push(next(iter(board.legal_moves)))
+        boards.append(board.copy(stack=False))
+    return boards
+
+
+@pytest.fixture(params=[1, 2], ids=["1-motor", "2-motores"])
+def pool(request):
+    pool = EnginePool([sys.executable, FAKE_ENGINE, str(SEARCH_TIME)], size=request.param, depth=1)
+    pool.start()
+    pool.warm_up()
+    yield pool
+    pool.close()
+
+
+def test_play_is_served_while_a_batch_runs(pool):
+    boards = positions(40)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+
+        async def collect():
+            return [item async for item in analyze_batch(pool, boards)]
+
+        batch = asyncio.create_task(collect())
+        await asyncio.sleep(5 * SEARCH_TIME)
+
+        started = loop.time()
+        async with pool.acquire(game_id=1, play=True):
+            waited = loop.time() - started
+            running = not batch.done()
+        return waited, running, await batch
+
+    waited, running, results = asyncio.run(scenario())
+
+    assert running
+    # No pior caso, a jogada espera a busca do lote que já estava em andamento
+    assert waited < 4 * SEARCH_TIME
+    assert sorted(index for index, _ in results) == list(range(len(boards)))
+    assert all(analysis is not None for _, analysis in results)
@@ -0,0 +1,37 @@
+"""Importação de PGN num banco criado pelas migrations."""
+import io
+
+from Model.games import Game
+from Model.moves import Move
+from Model.users import User
+from services.pgn import export_games, import_games
+
+PGN = b"""[Event "Casual"]
+[Date "2026.10.17"]
+[Result "1-0"]
+
+1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6 4. Qxf7# 1-0
+
+[Event "Em andamento"]
+[Result "*"]
+
+1. d4 d5 *
+"""
+
+
+def test_import_games(db, session_factory):
+    db.add(User(id=1, username="importador", password="x", email="importador@example.com"))
+    db.commit()
+
+    assert import_games(db, io.BytesIO(PGN), user_id=1) == {"imported": 1, "skipped": 1}
+
+    game = db.query(Game).filter(Game.user_id == 1).one()
+    assert game.status == "player_win"
+    assert game.begin_time.date().isoformat() == "2026-10-17"
+
+    moves = db.query(Move).filter(Move.game_id == game.id).order_by(Move.id).all()
+    assert [move.move for move in moves] == ["", "e2e4", "e7e5", "d1h5", "b8c6", "f1c4", "g8f6", "h5f7"]
+    assert [move.is_player for move in moves] == [None, True, False, True, False, True, False, True]
+
+    exported = "".join(export_games(session_factory, user_id=1))
+    assert "4. Qxf7# 1-0" in exported
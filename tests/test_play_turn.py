@@ -0,0 +1,72 @@
+"""Jogada do usuário e resposta do Stockfish (``main.play_turn``)."""
+import asyncio
+from contextlib import asynccontextmanager
+
+import chess
+import pytest
+from fastapi import BackgroundTasks
+
+import main
+from Model.games import Game
+from Model.moves import Move
+from services.active_games import ActiveGame
+from services.engine_pool import EngineUnavailableError
+
+
+class FakeEngine:
+    async def get_best_move_async(self, board: chess.Board) -> str:
+        return "g8f6"
+
+
+@pytest.fixture
+def active(db, monkeypatch):
+    async def classify(game_id, board, move):
+        return {"classification": "Boa"}
+
+    monkeypatch.setattr(main, "analyze_board_move", classify)
+    monkeypatch.setattr(main.evaluation_queue, "submit", lambda game_id: None)
+
+    game = Game(user_id=1, status="in_progress")
+    db.add(game)
+    db.commit()
+
+    # Fora do livro de aberturas: a resposta vem do motor
+    board = chess.Board()
+    for move in ("e2e4", "e7e6", "d2d4", "d7d5"):
+        board.push_uci(move)
+    return ActiveGame(game.id, 1, board)
+
+
+def saved_moves(db, game_id: int) -> list[str]:
+    return [row.move for row in db.query(Move.move).filter(Move.game_id == game_id).order_by(Move.id)]
+
+
+def test_engine_reply_is_saved_after_the_player_move(db, active, monkeypatch):
+    @asynccontextmanager
+    async def acquire(**kwargs):
+        yield FakeEngine()
+
+    monkeypatch.setattr(main.engine_pool, "acquire", acquire)
+
+    result = asyncio.run(main.play_turn(active, "b1c3", BackgroundTasks(), db))
+
+    assert result["stockfish_move"] == "g8f6"
+    assert saved_moves(db, active.game_id) == ["b1c3", "g8f6"]
+    assert active.board.move_stack[-2:] == [chess.Move.from_uci("b1c3"), chess.Move.from_uci("g8f6")]
+
+
+def test_engine_failure_keeps_the_player_to_move(db, active, monkeypatch):
+    @asynccontextmanager
+    async def acquire(**kwargs):
+        raise EngineUnavailableError("Os motores Stockfish ainda não estão prontos")
+        yield
+
+    monkeypatch.setattr(main.engine_pool, "acquire", acquire)
+    before = active.board.copy()
+
+    with pytest.raises(EngineUnavailableError):
+        asyncio.run(main.play_turn(active, "b1c3", BackgroundTasks(), db))
+
+    # Nada foi gravado: a nova tentativa do jogador é aceita
+    assert saved_moves(db, active.game_id) == []
+    assert active.board == before and active.board.move_stack == before.move_stack
@@ -0,0 +1,41 @@
+"""O ponder sobrevive à análise da jogada do jogador quando ele joga a resposta prevista."""
+import asyncio
+import sys
+from pathlib import Path
+
+import chess
+
+from services.engine_pool import EnginePool
+
+FAKE_ENGINE = str(Path(__file__).resolve().parent / "fake_engine.py")
+
+
+def test_ponder_hits_after_the_move_analysis():
+    # Um só motor: a análise da jogada e a resposta da IA usam o mesmo processo
+    pool = EnginePool([sys.executable, FAKE_ENGINE, "0.01"], size=1, depth=1, ponder=True)
+    pool.start()
+    pool.warm_up()
+    (worker,) = pool._workers
+
+    async def scenario():
+        board = chess.Board()
+        async with pool.acquire(game_id=1, play=True) as stockfish:
+            board.push_uci(await stockfish.get_best_move_async(board))
+        predicted = worker.pondering.move_stack[-1]
+
+        # O jogador faz a jogada prevista: a análise dela não pode interromper o ponder
+        async with pool.acquire(game_id=1) as stockfish:
+            analysis = await stockfish.get_move_analysis_async(board, predicted)
+        board.push(predicted)
+        async with pool.acquire(game_id=1, play=True) as stockfish:
+            await stockfish.get_best_move_async(board)
+        return predicted, analysis
+
+    try:
+        predicted, analysis = asyncio.run(scenario())
+    finally:
+        pool.close()
+
+    assert analysis["best_move"] == predicted.uci()
+    assert analysis["move_score"] == analysis["score"]
+    assert (worker.ponder_hits, worker.ponder_misses) == (1, 0)
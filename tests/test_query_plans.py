@@ -0,0 +1,12 @@
+"""Consultas quentes não podem voltar a varrer tabelas (``EXPLAIN QUERY PLAN``)."""
+import pytest
+
+from database.query_plans import HOT_QUERIES, query_plan, slow_steps
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_indexes(db, name):
+    plan = query_plan(db, HOT_QUERIES[name](db))
+
+    assert plan
+    assert slow_steps(plan) == [], f"{name}: {'; '.join(plan)}"